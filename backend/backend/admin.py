@@ -0,0 +1,27 @@
+from django.db.models import Q
+from .paginators import EstimatedCountPaginator
+
+
+class LargeTableAdminMixin:
+    """
+    ModelAdmin changelist tuned for a very large table: estimated counts, no full-table result
+    count, ordering by primary key, and exact index-backed search on `search_fields` (plain,
+    indexed field names) instead of the default case-insensitive LIKE scans. With
+    `search_by_pk`, numeric terms also match the primary key.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    ordering = ['-pk']
+    search_by_pk = False
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        condition = Q()
+        for field in self.search_fields:
+            condition |= Q(**{field: term})
+        if self.search_by_pk and term.isdigit():
+            condition |= Q(pk=int(term))
+        return queryset.filter(condition), False
@@ -2,6 +2,9 @@
 ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is how the app is served (``uvicorn backend.asgi:application``, see the Dockerfile).
+The card status events (/api/cards/events/) and export (/api/cards/export/) endpoints
+stream from async iterators, which a WSGI server would collect in full before sending.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
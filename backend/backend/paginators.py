@@ -0,0 +1,39 @@
+import json
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very large tables that avoids exact COUNT(*) scans.
+    Unfiltered querysets read the row count from PostgreSQL's statistics (pg_class.reltuples);
+    filtered ones use the planner's row estimate. Exact counts are only run when the estimate
+    is below ESTIMATED_COUNT_THRESHOLD, where they are cheap and the estimate is least accurate.
+    """
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is None or estimate < settings.ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+    def estimated_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        if not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # reltuples is -1 until the table has been vacuumed or analyzed.
+            return row[0] if row and row[0] >= 0 else None
+
+        plan = json.loads(queryset.explain(format='json'))
+        return plan[0]['Plan']['Plan Rows']
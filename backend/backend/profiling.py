@@ -0,0 +1,175 @@
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+PROFILING_TOKEN_SALT = 'backend.profiling'
+
+
+def make_profiling_token(user) -> str:
+    """Signed, expiring token that lets a staff user request a profile of their own requests."""
+    return signing.dumps({'user_id': user.pk}, salt=PROFILING_TOKEN_SALT)
+
+
+def profiling_token_user_id(token: str):
+    """Return the id of the user a profiling token was issued to, or None if it is invalid or expired."""
+    try:
+        payload = signing.loads(token, salt=PROFILING_TOKEN_SALT, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return payload.get('user_id')
+
+
+def request_user(request):
+    """The authenticated user making the request: the session user, or the user of a JWT bearer token."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result is not None else None
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for one thread. A background thread reads the target thread's stack
+    every `interval` seconds via sys._current_frames() and counts identical stacks, so the
+    profiled code runs unmodified and overhead stays roughly constant whatever it calls.
+    Results are written in the collapsed-stack format read by flamegraph.pl and speedscope.
+    """
+    def __init__(self, thread_id: int = None, interval: float = 0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='request-profiler', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(self._frame_name(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class ProfilingMiddleware:
+    """
+    Profiles individual requests on demand. A request is sampled when it carries, in the
+    X-Profile-Token header, a profiling token issued to the authenticated staff user making it,
+    or at random for PROFILING_SAMPLE_RATE of requests. Sits after AuthenticationMiddleware so
+    session users are known; API clients are identified from their JWT. The collapsed stacks
+    are saved to PROFILE_DIR/<trace id>.folded, keeping the newest PROFILING_MAX_FILES profiles,
+    and the id is returned in the X-Profile-Id header.
+    Requests that are not sampled only pay for the header lookup (and a random draw when
+    random sampling is on). Under ASGI the profiled thread is the one running the request's
+    synchronous code (the view and ORM), not the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def should_profile(self, request) -> bool:
+        token = request.headers.get('X-Profile-Token')
+        if token:
+            user_id = profiling_token_user_id(token)
+            if user_id is None:
+                return False
+            user = request_user(request)
+            return user is not None and user.is_staff and user.pk == user_id
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    @staticmethod
+    def prune(directory: Path):
+        """Delete the oldest profiles beyond PROFILING_MAX_FILES."""
+        profiles = sorted(directory.glob('*.folded'), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in profiles[settings.PROFILING_MAX_FILES:]:
+            path.unlink(missing_ok=True)
+
+    def save(self, request, response, profiler, trace_id, duration):
+        path = Path(settings.PROFILE_DIR) / f'{trace_id}.folded'
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(profiler.collapsed())
+            self.prune(path.parent)
+        except OSError:
+            logger.exception("Could not save request profile %s", path)
+            return response
+
+        logger.info(
+            "Saved profile %s for %s %s (%.1f ms, %d samples)",
+            path, request.method, request.path, duration * 1000, profiler.samples,
+        )
+        response['X-Profile-Id'] = trace_id
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        trace_id = getattr(request, 'trace_id', None) or uuid.uuid4().hex
+        started = time.perf_counter()
+        with SamplingProfiler(interval=settings.PROFILING_INTERVAL) as profiler:
+            response = self.get_response(request)
+        return self.save(request, response, profiler, trace_id, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        # Checking a token may load the user from the database; requests without one stay on the loop.
+        if request.headers.get('X-Profile-Token'):
+            profile = await sync_to_async(self.should_profile)(request)
+        else:
+            profile = self.should_profile(request)
+        if not profile:
+            return await self.get_response(request)
+
+        trace_id = getattr(request, 'trace_id', None) or uuid.uuid4().hex
+        sync_thread = await sync_to_async(threading.get_ident)()
+        started = time.perf_counter()
+        with SamplingProfiler(thread_id=sync_thread, interval=settings.PROFILING_INTERVAL) as profiler:
+            response = await self.get_response(request)
+        duration = time.perf_counter() - started
+        return await sync_to_async(self.save)(request, response, profiler, trace_id, duration)
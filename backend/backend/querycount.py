@@ -0,0 +1,143 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Collapses "IN (%s, %s, %s)" style placeholder lists so they share one shape whatever their length.
+PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+def query_shape(sql: str) -> str:
+    """Normalise a parametrised SQL statement so repeats of the same query compare equal."""
+    return PLACEHOLDER_LIST.sub('%s', sql)
+
+
+def instrument_connections(hook):
+    """
+    Install `hook` as a permanent `execute_wrapper` on every database connection: the ones this
+    thread already has and every connection opened later, in any thread. Django keeps connections
+    per thread, so under ASGI the queries of a request run on a connection the middleware never
+    sees; permanent hooks instead find their per-request state in context variables, which
+    sync_to_async copies into the thread running the query.
+    """
+    def install(connection, **kwargs):
+        if hook not in connection.execute_wrappers:
+            # Outermost, so connection.execute_wrapper() blocks can still pop their own wrapper.
+            connection.execute_wrappers.insert(0, hook)
+
+    connection_created.connect(install, weak=False, dispatch_uid=f'{hook.__module__}.{hook.__qualname__}')
+    for alias in connections:
+        install(connections[alias])
+
+
+_recorders = ContextVar('query_recorders', default=())
+
+
+def record_query(execute, sql, params, many, context):
+    """Permanent `execute_wrapper` hook timing each statement for the recorders active in this context."""
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for recorder in recorders:
+            recorder.queries.append((sql, duration))
+
+
+class QueryRecorder:
+    """
+    Records every SQL statement run while it is installed, with its duration, so callers can
+    count queries and spot repeated shapes (N+1 patterns).
+    """
+    def __init__(self):
+        self.queries = []
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def repeated(self, threshold: int) -> dict:
+        """Query shapes executed at least `threshold` times."""
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+    @contextmanager
+    def install(self):
+        """
+        Record queries on every configured database for the duration of the block, including
+        those run through sync_to_async from it. Recorders can be nested.
+        """
+        instrument_connections(record_query)
+        token = _recorders.set(_recorders.get() + (self,))
+        try:
+            yield self
+        finally:
+            _recorders.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int, repeat_threshold: int = None):
+    """
+    Fail with AssertionError if the block runs more than `max_queries` statements or,
+    when `repeat_threshold` is given, repeats any query shape that many times.
+    """
+    recorder = QueryRecorder()
+    with recorder.install():
+        yield recorder
+    details = '\n'.join(sql for sql, _ in recorder.queries)
+    assert recorder.count <= max_queries, (
+        f'{recorder.count} queries executed, budget is {max_queries}:\n{details}'
+    )
+    if repeat_threshold:
+        repeated = recorder.repeated(repeat_threshold)
+        assert not repeated, f'Repeated queries (possible N+1): {repeated}'
+
+
+class QueryInspectionMiddleware:
+    """
+    Development middleware that records the SQL run by each request, reports it in the
+    X-Query-Count / X-Query-Duration-Ms headers and logs query shapes repeated at least
+    QUERY_REPEAT_THRESHOLD times as likely N+1 patterns. The headers are sent before a
+    streaming body is produced, so they only cover the queries run before the view returned.
+    Removed from the stack entirely unless QUERY_INSPECTION_ENABLED is set.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryRecorder().install() as recorder:
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        with QueryRecorder().install() as recorder:
+            response = await self.get_response(request)
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        response['X-Query-Count'] = str(recorder.count)
+        response['X-Query-Duration-Ms'] = f'{sum(duration for _, duration in recorder.queries) * 1000:.1f}'
+        for shape, count in recorder.repeated(settings.QUERY_REPEAT_THRESHOLD).items():
+            logger.warning("Possible N+1: %s %s ran %d times: %s", request.method, request.path, count, shape)
+        return response
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import json
 import os
 from pathlib import Path
 from datetime import timedelta
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'cards',
     'users',
     'drf_yasg',
@@ -52,11 +54,14 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.CustomUser'
 
 MIDDLEWARE = [
+    'backend.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'backend.querycount.QueryInspectionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'backend.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -127,8 +132,31 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        # Card issuance per user, and across all users to stay within the provider's quota.
+        'card_issuance_user': os.environ.get('CARD_ISSUANCE_USER_RATE', '10/min'),
+        'card_issuance_provider': os.environ.get('CARD_ISSUANCE_PROVIDER_RATE', '600/min'),
+    },
 }
 
+# Cache
+# Rate-limit counters and invalidations of cached provider answers must be shared by every
+# process (web workers and management commands), so production should set REDIS_URL.
+# Without it each process gets its own in-memory cache.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
@@ -167,3 +195,82 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 SWAGGER_USE_COMPAT_RENDERERS = False
+
+# Card exports
+# Rows fetched per round trip from the server-side cursor used by streaming exports.
+CARD_EXPORT_CHUNK_SIZE = int(os.environ.get('CARD_EXPORT_CHUNK_SIZE', '2000'))
+
+# Maximum number of IDs accepted by the batch retrieve endpoint (/api/cards/batch-get/).
+CARD_BATCH_MAX_IDS = int(os.environ.get('CARD_BATCH_MAX_IDS', '100'))
+
+# Card archival (manage.py archive_cards)
+# Canceled, expired, failed and deactivated cards not updated for this many days are moved
+# to the archive table, CARD_ARCHIVE_BATCH_SIZE cards per transaction.
+CARD_ARCHIVE_AFTER_DAYS = int(os.environ.get('CARD_ARCHIVE_AFTER_DAYS', '180'))
+CARD_ARCHIVE_BATCH_SIZE = int(os.environ.get('CARD_ARCHIVE_BATCH_SIZE', '1000'))
+
+# Admin
+# Below this many (estimated) rows, admin changelists run an exact COUNT(*).
+ESTIMATED_COUNT_THRESHOLD = int(os.environ.get('ESTIMATED_COUNT_THRESHOLD', '10000'))
+
+# Card provider endpoints
+# Each entry is a providers.routing.ProviderEndpoint (name, base_url, region, weight).
+# Set BANK_PROVIDER_ENDPOINTS to a JSON list of such objects to issue through several endpoints.
+BANK_PROVIDER_ENDPOINTS = json.loads(os.environ.get('BANK_PROVIDER_ENDPOINTS', 'null')) or [
+    {'name': 'default', 'base_url': 'https://bankprovider.com/'},
+]
+# EWMA smoothing, error rate above which an endpoint is avoided, and share of calls used to re-probe endpoints.
+BANK_PROVIDER_ROUTING = {'alpha': 0.2, 'max_error_rate': 0.5, 'explore_ratio': 0.05}
+
+# Provider retries
+# Per-operation overrides of providers.retry.RetryPolicy; 'default' applies to every operation.
+# create_card is not idempotent (the provider has no idempotency key), so it is never hedged
+# and only retried when the request provably was not processed: the connection could not be
+# established, or the provider answered 503. A read timeout or a 500 may come after the card
+# was issued, and retrying could issue a second one.
+PROVIDER_RETRY_POLICIES = {
+    'default': {'max_attempts': 3, 'base_delay': 0.1, 'max_delay': 2.0},
+    'create_card': {'hedge': False, 'retry_statuses': (503,), 'retry_ambiguous': False},
+}
+
+# Seconds a provider "user not registered" answer is cached per external_id.
+# Changing a user's external_id clears the entry, but only in processes sharing the cache: without
+# REDIS_URL, changes made by import_users or update_superuser reach web workers only after this TTL.
+PROVIDER_UNREGISTERED_CACHE_TTL = int(os.environ.get('PROVIDER_UNREGISTERED_CACHE_TTL', '60'))
+
+# Query inspection
+# Records the SQL run by each request (X-Query-Count header, N+1 warnings). On by default in development.
+QUERY_INSPECTION_ENABLED = os.environ.get('QUERY_INSPECTION_ENABLED', str(DEBUG)) == 'True'
+# Identical query shapes repeated this many times in one request are logged as possible N+1s.
+QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', '3'))
+
+# Card status events (Server-Sent Events)
+# Idle streams send a keep-alive comment this often; clients reconnect after CARD_EVENTS_RETRY_MS.
+CARD_EVENTS_KEEPALIVE_SECONDS = int(os.environ.get('CARD_EVENTS_KEEPALIVE_SECONDS', '15'))
+CARD_EVENTS_RETRY_MS = int(os.environ.get('CARD_EVENTS_RETRY_MS', '3000'))
+
+# Request profiling
+# Staff can profile their own requests by sending a token from `manage.py profiling_token`
+# in the X-Profile-Token header; the token only works for the staff user it was issued to.
+# PROFILING_SAMPLE_RATE (0-1) also profiles that share of all requests at random.
+# Profiles are saved to PROFILE_DIR, which keeps the newest PROFILING_MAX_FILES.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'True') == 'True'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL', '0.005'))
+PROFILING_TOKEN_MAX_AGE = int(os.environ.get('PROFILING_TOKEN_MAX_AGE', '900'))
+PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', '200'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
+# Tracing
+# Spans for each request, card service call, provider call and SQL query. Incoming W3C
+# traceparent headers are continued, and the trace id is the trace_id returned in API errors.
+# TRACING_EXPORTER is 'otlp' (OTLP/HTTP JSON to TRACING_OTLP_ENDPOINT), 'console', 'file'
+# (JSON lines appended to TRACING_FILE) or 'none' to keep trace ids without recording spans.
+TRACING_EXPORTER = os.environ.get('TRACING_EXPORTER', 'none')
+TRACING_OTLP_ENDPOINT = os.environ.get('TRACING_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+TRACING_FILE = os.environ.get('TRACING_FILE', str(BASE_DIR / 'traces.jsonl'))
+TRACING_SERVICE_NAME = os.environ.get('TRACING_SERVICE_NAME', 'bling-cards')
+# Share of new traces recorded; traces continued from a traceparent header keep the caller's decision.
+TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE', '1.0'))
+# Spans are exported by a background thread in batches of up to max_batch_size, every schedule_delay seconds.
+TRACING_BATCH = {'max_queue_size': 2048, 'max_batch_size': 512, 'schedule_delay': 5.0}
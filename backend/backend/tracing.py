@@ -0,0 +1,463 @@
+import functools
+import json
+import logging
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+import requests
+from .querycount import instrument_connections
+
+logger = logging.getLogger(__name__)
+
+# version-trace_id-parent_id-flags, see https://www.w3.org/TR/trace-context/#traceparent-header
+TRACEPARENT = re.compile(r'^00-(?P<trace_id>[0-9a-f]{32})-(?P<parent_id>[0-9a-f]{16})-(?P<flags>[0-9a-f]{2})$')
+SAMPLED_FLAG = 0x01
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def parse_traceparent(header: str):
+    """Return (trace_id, parent_id, sampled) from a W3C traceparent header, or None if it is invalid."""
+    match = TRACEPARENT.match((header or '').strip().lower())
+    if not match or match['trace_id'] == '0' * 32 or match['parent_id'] == '0' * 16:
+        return None
+    return match['trace_id'], match['parent_id'], bool(int(match['flags'], 16) & SAMPLED_FLAG)
+
+
+class Span:
+    """One timed operation in a trace. Times are epoch nanoseconds, as in OTLP."""
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, kind: str = 'internal',
+                 attributes: dict = None, sampled: bool = True):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.sampled = sampled
+        self.error = None
+        self.start_time = time.time_ns()
+        self.end_time = None
+
+    @property
+    def traceparent(self) -> str:
+        """Header value that makes a downstream service continue this trace under this span."""
+        return f'00-{self.trace_id}-{self.span_id}-{SAMPLED_FLAG if self.sampled else 0:02x}'
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException):
+        self.error = f'{type(exc).__name__}: {exc}'
+
+    def end(self):
+        self.end_time = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_time or time.time_ns()) - self.start_time) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'kind': self.kind,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+_current_span = ContextVar('current_span', default=None)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_trace_id() -> str:
+    """Trace id of the active span, or a fresh id when nothing is being traced."""
+    span = _current_span.get()
+    return span.trace_id if span is not None else new_trace_id()
+
+
+@contextmanager
+def use_span(span: Span):
+    """Make `span` the active span for the block without ending it afterwards."""
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+class ConsoleSpanExporter:
+    """Writes finished spans as JSON lines to a stream (stdout by default), for local use."""
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def export(self, spans):
+        self.stream.write(''.join(json.dumps(span.to_dict()) + '\n' for span in spans))
+        self.stream.flush()
+
+
+class FileSpanExporter:
+    """Appends finished spans as JSON lines to a file, for offline inspection."""
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans):
+        with open(self.path, 'a') as f:
+            f.write(''.join(json.dumps(span.to_dict()) + '\n' for span in spans))
+
+
+class InMemorySpanExporter:
+    """Keeps finished spans in a list; used by tests."""
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+class OTLPHttpExporter:
+    """Sends spans to an OpenTelemetry collector with the OTLP/HTTP JSON protocol."""
+    STATUS_OK, STATUS_ERROR = 1, 2
+    KINDS = {'internal': 1, 'server': 2, 'client': 3}
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    @staticmethod
+    def _value(value) -> dict:
+        if isinstance(value, bool):
+            return {'boolValue': value}
+        if isinstance(value, int):
+            return {'intValue': str(value)}
+        if isinstance(value, float):
+            return {'doubleValue': value}
+        return {'stringValue': str(value)}
+
+    def _span(self, span: Span) -> dict:
+        data = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': self.KINDS.get(span.kind, 1),
+            'startTimeUnixNano': str(span.start_time),
+            'endTimeUnixNano': str(span.end_time),
+            'attributes': [{'key': key, 'value': self._value(value)} for key, value in span.attributes.items()],
+            'status': {'code': self.STATUS_ERROR, 'message': span.error} if span.error else {'code': self.STATUS_OK},
+        }
+        if span.parent_id:
+            data['parentSpanId'] = span.parent_id
+        return data
+
+    def export(self, spans):
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': self._value(self.service_name)}]},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': [self._span(span) for span in spans]}],
+        }]}
+        self.session.post(self.endpoint, json=payload, timeout=self.timeout).raise_for_status()
+
+
+class BatchSpanProcessor:
+    """
+    Queues finished spans and exports them from a background thread, in batches of up to
+    `max_batch_size`, every `schedule_delay` seconds or as soon as a full batch is waiting.
+    Request threads never wait on the exporter: when the queue is full, new spans are dropped
+    and counted, and export errors are logged rather than raised.
+    """
+    def __init__(self, exporter, max_queue_size: int = 2048, max_batch_size: int = 512, schedule_delay: float = 5.0):
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.schedule_delay = schedule_delay
+        self.dropped = 0
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._export_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span):
+        with self._condition:
+            if len(self._queue) >= self.max_queue_size:
+                self.dropped += 1
+                return
+            self._queue.append(span)
+            if len(self._queue) >= self.max_batch_size:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopped and len(self._queue) < self.max_batch_size:
+                    self._condition.wait(self.schedule_delay)
+                if self._stopped and not self._queue:
+                    return
+            self.force_flush()
+
+    def force_flush(self):
+        """Export everything queued so far, in batches."""
+        with self._export_lock:
+            while True:
+                with self._condition:
+                    batch = [self._queue.popleft() for _ in range(min(self.max_batch_size, len(self._queue)))]
+                if not batch:
+                    return
+                try:
+                    self.exporter.export(batch)
+                except Exception:
+                    logger.exception("Failed to export %d spans", len(batch))
+
+    def shutdown(self, timeout: float = 5.0):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join(timeout)
+
+
+class Tracer:
+    """
+    Creates spans and hands finished, sampled ones to `processor`.
+    The active span is kept in a context variable, so nested spans pick up their parent
+    within a thread or asyncio task. With no processor, spans still carry trace ids (for
+    error bodies and propagation) but are never recorded.
+    """
+    def __init__(self, processor=None, sample_rate: float = 1.0):
+        self.processor = processor
+        self.sample_rate = sample_rate
+
+    def create_span(self, name: str, kind: str = 'internal', attributes: dict = None, traceparent: str = None) -> Span:
+        """
+        A new span, not yet active. The parent is the active span or, for a root span, the
+        remote parent from a W3C `traceparent` header, whose sampling decision is kept.
+        """
+        parent = _current_span.get()
+        remote = parse_traceparent(traceparent) if parent is None and traceparent else None
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        elif remote is not None:
+            trace_id, parent_id, sampled = remote
+        else:
+            trace_id, parent_id = new_trace_id(), None
+            sampled = self.processor is not None and random.random() < self.sample_rate
+        return Span(name, trace_id, parent_id, kind=kind, attributes=attributes, sampled=sampled)
+
+    def end_span(self, span: Span):
+        span.end()
+        if span.sampled and self.processor is not None:
+            self.processor.on_end(span)
+
+    @contextmanager
+    def start_span(self, name: str, kind: str = 'internal', attributes: dict = None, traceparent: str = None):
+        """Run the block inside a new span, created as in create_span()."""
+        span = self.create_span(name, kind=kind, attributes=attributes, traceparent=traceparent)
+        try:
+            with use_span(span):
+                yield span
+        except BaseException as exc:
+            span.record_error(exc)
+            raise
+        finally:
+            self.end_span(span)
+
+
+def build_exporter(name: str):
+    if name == 'otlp':
+        return OTLPHttpExporter(settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME)
+    if name == 'console':
+        return ConsoleSpanExporter()
+    if name == 'file':
+        return FileSpanExporter(settings.TRACING_FILE)
+    if name == 'none':
+        return None
+    raise ValueError(f"Unknown TRACING_EXPORTER {name!r}")
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """The process-wide tracer, built from settings on first use."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            exporter = build_exporter(settings.TRACING_EXPORTER)
+            processor = BatchSpanProcessor(exporter, **settings.TRACING_BATCH) if exporter else None
+            _tracer = Tracer(processor, sample_rate=settings.TRACING_SAMPLE_RATE)
+        return _tracer
+
+
+@receiver(setting_changed)
+def _reset_tracer(setting, **kwargs):
+    global _tracer
+    if setting.startswith('TRACING_'):
+        with _tracer_lock:
+            if _tracer is not None and _tracer.processor is not None:
+                _tracer.processor.shutdown()
+            _tracer = None
+
+
+def traced(name: str):
+    """Decorator running each call of the function inside a span called `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_query(execute, sql, params, many, context):
+    """Permanent `execute_wrapper` hook recording one client span per SQL statement run under a sampled span."""
+    span = _current_span.get()
+    if span is None or not span.sampled:
+        return execute(sql, params, many, context)
+    connection = context['connection']
+    attributes = {'db.system': connection.vendor, 'db.name': connection.alias, 'db.statement': sql}
+    with get_tracer().start_span('db.query', kind='client', attributes=attributes):
+        return execute(sql, params, many, context)
+
+
+class TracedStream:
+    """
+    Streaming response body that makes the request span active while each chunk is produced,
+    so SQL run by the body is traced under it, and ends the span once the body is exhausted,
+    fails or is closed with the response.
+    """
+    def __init__(self, content, span: Span, tracer: Tracer):
+        self.content = content
+        self.span = span
+        self.tracer = tracer
+        self.ended = False
+
+    def fail(self, exc: BaseException):
+        self.span.record_error(exc)
+        self.close()
+
+    def close(self):
+        if not self.ended:
+            self.ended = True
+            self.tracer.end_span(self.span)
+
+
+class SyncTracedStream(TracedStream):
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with use_span(self.span):
+            try:
+                return next(self.content)
+            except StopIteration:
+                self.close()
+                raise
+            except Exception as exc:
+                self.fail(exc)
+                raise
+
+
+class AsyncTracedStream(TracedStream):
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        with use_span(self.span):
+            try:
+                return await anext(self.content)
+            except StopAsyncIteration:
+                self.close()
+                raise
+            except Exception as exc:
+                self.fail(exc)
+                raise
+
+
+class TracingMiddleware:
+    """
+    Opens the root server span for each request, continuing the caller's trace when a W3C
+    `traceparent` header is present, and records SQL statements as child spans. The trace id
+    is exposed as `request.trace_id` and in the X-Trace-Id response header, and is the id
+    returned as `trace_id` in API error bodies. For streaming responses the span stays open
+    until the body has been sent, so it covers the SQL the body runs.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        instrument_connections(trace_query)
+
+    def start(self, request):
+        tracer = get_tracer()
+        span = tracer.create_span(
+            f'{request.method} {request.path}', kind='server',
+            attributes={'http.request.method': request.method, 'url.path': request.path},
+            traceparent=request.headers.get('traceparent'),
+        )
+        request.trace_id = span.trace_id
+        return tracer, span
+
+    def finish(self, tracer, span, response):
+        span.set_attribute('http.response.status_code', response.status_code)
+        response['X-Trace-Id'] = span.trace_id
+        if response.streaming:
+            stream = AsyncTracedStream if response.is_async else SyncTracedStream
+            response.streaming_content = stream(response.streaming_content, span, tracer)
+        else:
+            tracer.end_span(span)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tracer, span = self.start(request)
+        try:
+            with use_span(span):
+                response = self.get_response(request)
+        except BaseException as exc:
+            span.record_error(exc)
+            tracer.end_span(span)
+            raise
+        return self.finish(tracer, span, response)
+
+    async def __acall__(self, request):
+        tracer, span = self.start(request)
+        try:
+            with use_span(span):
+                response = await self.get_response(request)
+        except BaseException as exc:
+            span.record_error(exc)
+            tracer.end_span(span)
+            raise
+        return self.finish(tracer, span, response)
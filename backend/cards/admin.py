@@ -1,3 +1,35 @@
+from django.conf import settings
 from django.contrib import admin
+from backend.admin import LargeTableAdminMixin
+from .models import Card
 
-# Register your models here.
+
+class ProviderListFilter(admin.SimpleListFilter):
+    """
+    Filter by issuing provider endpoint. The choices come from BANK_PROVIDER_ENDPOINTS, because
+    the default filter for a plain CharField runs SELECT DISTINCT over the whole table.
+    """
+    title = 'provider'
+    parameter_name = 'provider'
+
+    def lookups(self, request, model_admin):
+        return [(endpoint['name'], endpoint['name']) for endpoint in settings.BANK_PROVIDER_ENDPOINTS]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(provider=self.value())
+        return queryset
+
+
+@admin.register(Card)
+class CardAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Cards changelist; users are fetched in the same query and only the primary key is sortable."""
+    list_display = ['id', 'external_id', 'user', 'provider', 'status', 'color', 'expiration_date', 'created_at']
+    list_select_related = ['user']
+    list_filter = ['status', 'color', ProviderListFilter]
+    search_fields = ['external_id']
+    search_by_pk = True
+    search_help_text = 'Exact card ID or provider external ID.'
+    sortable_by = ['id']
+    raw_id_fields = ['user']
+    readonly_fields = ['created_at', 'updated_at']
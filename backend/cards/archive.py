@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from .models import ArchivedCard, Card, TERMINAL_STATUS_VALUES
+
+
+class CardArchiver:
+    """
+    Moves terminal cards whose last change is older than `older_than` from cards_card to
+    cards_archivedcard, at most `batch_size` cards per transaction. Each batch locks its rows
+    (skipping any another archiver holds), copies them with INSERT ... SELECT and deletes them,
+    so a card is always in exactly one table and row locks are only held for one batch.
+    """
+    def __init__(self, older_than: timedelta = None, batch_size: int = None, using: str = 'default'):
+        self.older_than = older_than if older_than is not None else timedelta(days=settings.CARD_ARCHIVE_AFTER_DAYS)
+        self.batch_size = batch_size or settings.CARD_ARCHIVE_BATCH_SIZE
+        self.using = using
+
+    def candidates(self, cutoff):
+        """Terminal cards last updated before `cutoff`, found through card_terminal_updated_idx."""
+        return Card.objects.using(self.using).filter(
+            status__in=TERMINAL_STATUS_VALUES, updated_at__lt=cutoff,
+        ).order_by()
+
+    def archive_batch(self, cutoff) -> int:
+        """Archive one batch of candidates, returning how many cards were moved."""
+        connection = connections[self.using]
+        quote = connection.ops.quote_name
+        columns = ', '.join(
+            quote(field.column) for field in ArchivedCard._meta.concrete_fields if field.name != 'archived_at'
+        )
+        with transaction.atomic(using=self.using):
+            ids = list(
+                self.candidates(cutoff).select_for_update(skip_locked=True).values_list('pk', flat=True)[:self.batch_size]
+            )
+            if not ids:
+                return 0
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {quote(ArchivedCard._meta.db_table)} ({columns}, {quote("archived_at")}) '
+                    f'SELECT {columns}, %s FROM {quote(Card._meta.db_table)} WHERE id = ANY(%s)',
+                    [timezone.now(), ids],
+                )
+                cursor.execute(f'DELETE FROM {quote(Card._meta.db_table)} WHERE id = ANY(%s)', [ids])
+        return len(ids)
+
+    def batches(self, max_batches: int = None, pause: float = 0.0):
+        """
+        Archive batch after batch until no candidates remain (or `max_batches` have run),
+        yielding the size of each. `pause` seconds between batches spreads out the write load.
+        The cutoff is fixed when archival starts, so the run always terminates.
+        """
+        cutoff = timezone.now() - self.older_than
+        done = 0
+        while max_batches is None or done < max_batches:
+            moved = self.archive_batch(cutoff)
+            if not moved:
+                return
+            done += 1
+            yield moved
+            if moved < self.batch_size:
+                return
+            if pause:
+                time.sleep(pause)
@@ -51,4 +51,39 @@ class CardNotFoundError(ServiceException):
         "error": "card_not_found",
         "message": "The requested card was not found.",
     }
-    default_code = 'card_not_found' 
\ No newline at end of file
+    default_code = 'card_not_found' 
+
+
+class InvalidStatusTransitionError(ServiceException):
+    """Raised when a card status change is not allowed from its current status."""
+    status_code = 409
+    default_detail = {
+        "error": "invalid_status_transition",
+        "message": "The card cannot move to the requested status.",
+    }
+    default_code = 'invalid_status_transition'
+
+
+class CardUpdateConflictError(ServiceException):
+    """Raised when a card keeps being modified concurrently and an update cannot be applied."""
+    status_code = 409
+    default_detail = {
+        "error": "card_update_conflict",
+        "message": "The card was modified concurrently. Please try again.",
+    }
+    default_code = 'card_update_conflict'
+
+
+class RateLimitedError(ServiceException):
+    """Raised when a client exceeds its card issuance rate, or the provider quota is exhausted."""
+    status_code = 429
+    default_detail = {
+        "error": "rate_limited",
+        "message": "Too many card requests. Please retry later.",
+    }
+    default_code = 'rate_limited'
+
+    def __init__(self, wait=None, detail=None, code=None):
+        super().__init__(detail, code)
+        # DRF's exception handler turns `wait` into a Retry-After header.
+        self.wait = wait
@@ -0,0 +1,95 @@
+import csv
+import json
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+
+EXPORT_FIELDS = [
+    'id', 'user_id', 'external_id', 'provider', 'status', 'color', 'expiration_date', 'created_at', 'updated_at',
+]
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class _LineBuffer:
+    """File-like object whose write() hands the formatted line back instead of storing it."""
+    def write(self, value):
+        return value
+
+
+class CardExporter:
+    """
+    Streams card querysets (e.g. live and archived cards) one after another as NDJSON or CSV
+    lines without materialising them in memory. Rows are read as tuples through PostgreSQL
+    server-side cursors, `chunk_size` rows at a time.
+    lines() serves synchronous callers such as the export_cards command; alines() serves the
+    HTTP endpoint under ASGI, where Django would otherwise buffer a sync iterator in full.
+    """
+    def __init__(self, querysets, export_format: str = 'ndjson', chunk_size: int = None):
+        if export_format not in EXPORT_CONTENT_TYPES:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        self.querysets = list(querysets)
+        self.export_format = export_format
+        self.chunk_size = chunk_size or settings.CARD_EXPORT_CHUNK_SIZE
+        self._csv_writer = csv.writer(_LineBuffer())
+
+    @property
+    def content_type(self):
+        return EXPORT_CONTENT_TYPES[self.export_format]
+
+    def rows(self):
+        """
+        Yield one tuple per card. The iteration runs inside a transaction so the cursors are not
+        declared WITH HOLD, which would make PostgreSQL materialise the whole result up front.
+        When it is the outermost transaction it runs at REPEATABLE READ, so every queryset reads
+        the same snapshot and a card archived mid-export appears exactly once.
+        """
+        using = self.querysets[0].db if self.querysets else 'default'
+        connection = connections[using]
+        outermost = not connection.in_atomic_block
+        with transaction.atomic(using=using):
+            if outermost:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            for queryset in self.querysets:
+                yield from queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=self.chunk_size)
+
+    def header(self):
+        """Lines written before the first card: the CSV header row, nothing for NDJSON."""
+        if self.export_format == 'csv':
+            return [self._csv_writer.writerow(EXPORT_FIELDS)]
+        return []
+
+    def format_row(self, row) -> str:
+        if self.export_format == 'csv':
+            return self._csv_writer.writerow(row)
+        return json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+    def lines(self):
+        """Yield the export line by line, including the CSV header row."""
+        yield from self.header()
+        for row in self.rows():
+            yield self.format_row(row)
+
+    async def alines(self):
+        """
+        Async version of lines(). Each chunk of rows is fetched with sync_to_async, which runs on
+        the request's one sync thread, so the cursor and its transaction stay on one connection and
+        at most `chunk_size` rows are held at a time. The row generator is closed on that thread
+        too, so a client disconnect still ends the transaction and releases the cursor.
+        """
+        rows = self.rows()
+        fetch_chunk = sync_to_async(lambda: list(islice(rows, self.chunk_size)))
+        try:
+            for line in self.header():
+                yield line
+            while chunk := await fetch_chunk():
+                for row in chunk:
+                    yield self.format_row(row)
+        finally:
+            await sync_to_async(rows.close)()
@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from django.db.models import F
+from django.utils import timezone
+from .models import Card, CardChoices, PROVIDER_STATUS_ALIASES
+from .exceptions import CardNotFoundError, InvalidInputError, InvalidStatusTransitionError, CardUpdateConflictError
+
+Status = CardChoices.Status
+
+# Statuses a card may move to from each status. Terminal statuses allow no further transition.
+ALLOWED_TRANSITIONS = {
+    Status.NOT_SUBMITTED: {Status.ORDERED, Status.FAILED, Status.CANCELED},
+    Status.ORDERED: {Status.SENT, Status.FAILED, Status.CANCELED},
+    Status.SENT: {Status.ACTIVATED, Status.OPPOSED, Status.EXPIRED, Status.CANCELED},
+    Status.ACTIVATED: {Status.DEACTIVATED, Status.OPPOSED, Status.EXPIRED, Status.CANCELED},
+    Status.OPPOSED: {Status.EXPIRED, Status.CANCELED},
+    Status.EXPIRED: set(),
+    Status.FAILED: set(),
+    Status.DEACTIVATED: set(),
+    Status.CANCELED: set(),
+}
+
+
+def normalize_status(value: str) -> Status:
+    """Map a stored or provider status (e.g. "ORDERED", "CANCELLED") onto CardChoices.Status."""
+    value = value or ''
+    try:
+        return PROVIDER_STATUS_ALIASES.get(value.upper()) or Status(value.lower())
+    except ValueError:
+        raise InvalidInputError(detail={"error": "invalid_status", "message": f"Unknown card status: {value}."})
+
+
+@dataclass(frozen=True)
+class StatusTransition:
+    card_id: int
+    from_status: str
+    to_status: str
+    version: int
+
+
+class CardLifecycle:
+    """
+    Applies card status changes without row locks. Each transition is validated against
+    ALLOWED_TRANSITIONS and written with a single conditional UPDATE on the version it read,
+    so concurrent writers never overwrite each other; the loser re-reads and retries.
+    """
+    max_attempts = 5
+
+    @staticmethod
+    def _current_state(card_id: int):
+        state = Card.objects.filter(pk=card_id).values_list('status', 'version').first()
+        if state is None:
+            raise CardNotFoundError()
+        return state
+
+    @classmethod
+    def transition(cls, card_id: int, new_status: str) -> StatusTransition:
+        """
+        Move the card to `new_status`. Repeating the current status is a no-op, so duplicate
+        provider events are harmless. Raises InvalidStatusTransitionError for moves the table
+        forbids and CardUpdateConflictError if the row keeps changing under us.
+        """
+        target = normalize_status(new_status)
+        for _ in range(cls.max_attempts):
+            stored_status, version = cls._current_state(card_id)
+            current = normalize_status(stored_status)
+            if current == target:
+                return StatusTransition(card_id, current, target, version)
+            if target not in ALLOWED_TRANSITIONS[current]:
+                raise InvalidStatusTransitionError(detail={
+                    "error": "invalid_status_transition",
+                    "message": f"A card cannot move from {current.value} to {target.value}.",
+                })
+
+            updated = Card.objects.filter(pk=card_id, version=version).update(
+                status=target, version=F('version') + 1, updated_at=timezone.now(),
+            )
+            if updated:
+                return StatusTransition(card_id, current, target, version + 1)
+        raise CardUpdateConflictError()
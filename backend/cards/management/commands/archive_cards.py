@@ -0,0 +1,42 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from cards.archive import CardArchiver
+
+
+class Command(BaseCommand):
+    help = 'Moves old canceled, expired, failed and deactivated cards to the archive table in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            help='Archive terminal cards not updated for this many days (defaults to CARD_ARCHIVE_AFTER_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Cards moved per transaction (defaults to CARD_ARCHIVE_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Stop after this many batches (defaults to running until no candidates remain)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to wait between batches',
+        )
+
+    def handle(self, *args, **options):
+        older_than = None
+        if options['older_than_days'] is not None:
+            older_than = timedelta(days=options['older_than_days'])
+        archiver = CardArchiver(older_than=older_than, batch_size=options['batch_size'])
+
+        total = 0
+        for moved in archiver.batches(max_batches=options['max_batches'], pause=options['pause']):
+            total += moved
+            self.stdout.write(f'Archived {moved} cards ({total} so far)')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} cards'))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from cards.exports import CardExporter, EXPORT_CONTENT_TYPES
+from cards.services import CardService
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Streams cards (for one user or all users) to a file as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=list(EXPORT_CONTENT_TYPES),
+            default='ndjson',
+            help='Output format',
+        )
+        parser.add_argument(
+            '--username',
+            type=str,
+            help='Only export the cards of this user (defaults to every card)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='File to write to (defaults to stdout)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Rows fetched per round trip from the server-side cursor',
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['username']:
+            try:
+                user = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f'User with username {options["username"]} not found')
+
+        exporter = CardExporter(CardService.export_cards(user), options['format'], options['chunk_size'])
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            count = 0
+            for line in exporter.lines():
+                output.write(line)
+                count += 1
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['output']:
+            rows = count - 1 if options['format'] == 'csv' else count
+            self.stderr.write(self.style.SUCCESS(f'Exported {rows} cards to {options["output"]}'))
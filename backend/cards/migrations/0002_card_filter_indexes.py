@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', '-created_at'], name='card_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='card_user_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'color', '-created_at'], name='card_user_color_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(condition=models.Q(('expiration_date__isnull', False)), fields=['user', 'expiration_date'], name='card_user_expiration_idx'),
+        ),
+        # Drop the standalone user_id index only once the composite ones exist.
+        migrations.AlterField(
+            model_name='card',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
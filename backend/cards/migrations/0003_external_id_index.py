@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0002_card_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='card',
+            name='external_id',
+            field=models.CharField(blank=True, db_index=True, max_length=120, null=True),
+        ),
+    ]
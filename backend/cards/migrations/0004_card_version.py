@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0003_external_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
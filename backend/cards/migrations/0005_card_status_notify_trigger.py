@@ -0,0 +1,39 @@
+from django.db import migrations
+
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION cards_card_notify_status() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('card_status', json_build_object(
+        'id', NEW.id,
+        'user_id', NEW.user_id,
+        'status', NEW.status,
+        'version', NEW.version,
+        'updated_at', NEW.updated_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER cards_card_status_notify
+AFTER UPDATE OF status ON cards_card
+FOR EACH ROW
+WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION cards_card_notify_status();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS cards_card_status_notify ON cards_card;
+DROP FUNCTION IF EXISTS cards_card_notify_status();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0004_card_version'),
+    ]
+
+    operations = [
+        # Notifies cards.notifications.CARD_STATUS_CHANNEL on every status change, at commit time.
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
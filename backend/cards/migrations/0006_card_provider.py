@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0005_card_status_notify_trigger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='provider',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0006_card_provider'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCard',
+            fields=[
+                ('status', models.CharField(choices=[('not_submitted', 'Not Submitted'), ('ordered', 'Ordered'), ('sent', 'Sent'), ('activated', 'Activated'), ('expired', 'Expired'), ('opposed', 'Opposed'), ('failed', 'Failed'), ('deactivated', 'Deactivated'), ('canceled', 'Canceled')], default='not_submitted', max_length=32)),
+                ('external_id', models.CharField(blank=True, db_index=True, max_length=120, null=True)),
+                ('color', models.CharField(blank=True, choices=[('black', 'Black'), ('pink', 'Pink')], max_length=10, null=True)),
+                ('expiration_date', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('provider', models.CharField(blank=True, default='', max_length=64)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(condition=models.Q(('status__in', ['CANCELED', 'CANCELLED', 'DEACTIVATED', 'EXPIRED', 'FAILED', 'canceled', 'deactivated', 'expired', 'failed'])), fields=['updated_at'], name='card_terminal_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedcard',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcard',
+            index=models.Index(fields=['user', '-created_at'], name='archived_card_user_created_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 from users.models import CustomUser as User
 
@@ -22,19 +23,81 @@ class CardChoices:
         CANCELED = "canceled", _("Canceled")
 
 
-class Card(models.Model):
+# Provider spellings that differ from our status values beyond letter case. Provider statuses
+# are stored as returned: upper case (e.g. "ORDERED"), and "CANCELLED" for canceled cards.
+PROVIDER_STATUS_ALIASES = {'CANCELLED': CardChoices.Status.CANCELED}
+
+
+def status_spellings(status) -> set:
+    """Every spelling of `status` that may be stored in cards_card: ours, the provider's upper case and aliases."""
+    status = CardChoices.Status(status)
+    aliases = {alias for alias, aliased in PROVIDER_STATUS_ALIASES.items() if aliased == status}
+    return {status.value, status.value.upper()} | aliases
+
+
+# Statuses a card can never leave (see cards.lifecycle.ALLOWED_TRANSITIONS), in every stored spelling.
+# Cards in these statuses are moved to ArchivedCard once old enough (see cards.archive).
+TERMINAL_STATUS_VALUES = sorted(
+    set().union(*(
+        status_spellings(status)
+        for status in (CardChoices.Status.EXPIRED, CardChoices.Status.FAILED,
+                       CardChoices.Status.DEACTIVATED, CardChoices.Status.CANCELED)
+    ))
+)
+
+
+class BaseCard(models.Model):
+    """Columns shared by live cards and archived ones."""
     status = models.CharField(max_length=32, choices=CardChoices.Status.choices,
                               default=CardChoices.Status.NOT_SUBMITTED)
-    external_id = models.CharField(max_length=120, null=True, blank=True)
+    external_id = models.CharField(max_length=120, null=True, blank=True, db_index=True)
     color = models.CharField(max_length=10, null=True, blank=True, choices=CardChoices.Color.choices)
     expiration_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Name of the provider endpoint (see providers.routing) that issued the card.
+    provider = models.CharField(max_length=64, blank=True, default='')
+    # Incremented on every status change; writers update only the version they read (see cards.lifecycle).
+    version = models.PositiveIntegerField(default=0)
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Lookups by user are served by the composite indexes below, which all lead with user_id.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
 
     def __str__(self):
-        return self.external_id
+        # external_id is null until (or unless) the provider returns one.
+        return self.external_id or f'Card {self.pk}'
 
     class Meta:
+        abstract = True
         ordering = ['-created_at']
+
+
+class Card(BaseCard):
+    class Meta(BaseCard.Meta):
+        indexes = [
+            # Default listing (ordered by -created_at) and created_at ranges.
+            models.Index(fields=['user', '-created_at'], name='card_user_created_idx'),
+            # Status and color filters, keeping the listing order without a sort step.
+            models.Index(fields=['user', 'status', '-created_at'], name='card_user_status_created_idx'),
+            models.Index(fields=['user', 'color', '-created_at'], name='card_user_color_created_idx'),
+            # Expiration ranges; cards without an expiration date can never match one.
+            models.Index(fields=['user', 'expiration_date'], name='card_user_expiration_idx',
+                         condition=Q(expiration_date__isnull=False)),
+            # Archival candidates; only terminal cards are indexed, so live traffic pays nothing for it.
+            models.Index(fields=['updated_at'], name='card_terminal_updated_idx',
+                         condition=Q(status__in=TERMINAL_STATUS_VALUES)),
+        ]
+
+
+class ArchivedCard(BaseCard):
+    """
+    Terminal cards moved out of cards_card by cards.archive.CardArchiver.
+    The original primary key is kept, so a card has the same id before and after archival.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    archived_at = models.DateTimeField()
+
+    class Meta(BaseCard.Meta):
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_card_user_created_idx'),
+        ]
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Channel the cards_card status trigger (migration 0005) notifies on.
+CARD_STATUS_CHANNEL = 'card_status'
+
+
+class Subscription:
+    """Queue of status events for one client connection, consumed on its event loop."""
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop, maxsize: int = 100):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event: dict):
+        """Called from the listener thread; hands the event to the subscriber's loop."""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Dropping card status event for slow subscriber user_id=%s", self.user_id)
+
+
+class CardStatusListener:
+    """
+    Process-wide PostgreSQL LISTEN on the card status channel. One background thread owns a
+    single dedicated connection and fans notifications out to every subscribed client of the
+    card's owner, so the number of DB connections does not grow with the number of clients.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, channel: str = CARD_STATUS_CHANNEL, using: str = 'default'):
+        self.channel = channel
+        self.using = using
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._thread = None
+        self._stopped = threading.Event()
+        # Set while the LISTEN connection is established.
+        self.listening = threading.Event()
+
+    @classmethod
+    def get(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Register a subscriber on the running event loop, starting the listener if needed."""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def dispatch(self, payload: str):
+        """Deliver one NOTIFY payload to the subscribers of the card's owner."""
+        try:
+            event = json.loads(payload)
+            user_id = event['user_id']
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed card status notification: %r", payload)
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='card-status-listener', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _connect(self):
+        wrapper = connections[self.using]
+        connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {self.channel}')
+        return connection
+
+    def _run(self):
+        connection = None
+        while not self._stopped.is_set():
+            try:
+                if connection is None:
+                    connection = self._connect()
+                    self.listening.set()
+                if select.select([connection], [], [], 1.0) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    self.dispatch(connection.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("Card status listener failed, reconnecting")
+                self.listening.clear()
+                if connection is not None:
+                    connection.close()
+                connection = None
+                self._stopped.wait(1.0)
+        self.listening.clear()
+        if connection is not None:
+            connection.close()
@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Card, CardChoices
+from .exports import EXPORT_CONTENT_TYPES
 
 class CardCreateSerializer(serializers.Serializer):
     """
@@ -9,8 +11,85 @@ class CardCreateSerializer(serializers.Serializer):
     color = serializers.ChoiceField(choices=CardChoices.Color.choices)
 
 
+class CardFilterSerializer(serializers.Serializer):
+    """
+    Validates the query parameters accepted by the card list endpoint.
+    Every filter is optional; `status` may be repeated and ranges are inclusive.
+    """
+    status = serializers.MultipleChoiceField(choices=CardChoices.Status.choices, required=False)
+    color = serializers.ChoiceField(choices=CardChoices.Color.choices, required=False)
+    expiration_date_after = serializers.DateTimeField(required=False)
+    expiration_date_before = serializers.DateTimeField(required=False)
+    created_at_after = serializers.DateTimeField(required=False)
+    created_at_before = serializers.DateTimeField(required=False)
+    include_archived = serializers.BooleanField(default=False, help_text="Also list archived (old terminal) cards.")
+
+    def validate(self, attrs):
+        for field in ('expiration_date', 'created_at'):
+            after, before = attrs.get(f'{field}_after'), attrs.get(f'{field}_before')
+            if after and before and after > before:
+                raise serializers.ValidationError({f'{field}_after': f'Must not be later than {field}_before.'})
+        return attrs
+
+
+class CardRetrieveSerializer(serializers.Serializer):
+    """Validates the query parameters of the card detail endpoint."""
+    include_archived = serializers.BooleanField(default=False, help_text="Also look the card up among archived cards.")
+
+
+class CardExportSerializer(serializers.Serializer):
+    """
+    Validates the query parameters of the streaming export endpoint.
+    `scope=all` exports every user's cards and is restricted to staff in the view.
+    """
+    export_format = serializers.ChoiceField(choices=list(EXPORT_CONTENT_TYPES), default='ndjson')
+    scope = serializers.ChoiceField(choices=['user', 'all'], default='user')
+
+
+class CardBatchSerializer(serializers.Serializer):
+    """Validates the comma-separated `ids` of the batch retrieve endpoint, capped at CARD_BATCH_MAX_IDS."""
+    ids = serializers.CharField(help_text="Comma-separated card IDs, e.g. '12,15,31'.")
+
+    def validate_ids(self, value):
+        try:
+            ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+        except ValueError:
+            raise serializers.ValidationError('IDs must be integers.')
+        if not ids:
+            raise serializers.ValidationError('At least one ID is required.')
+        if len(ids) > settings.CARD_BATCH_MAX_IDS:
+            raise serializers.ValidationError(f'At most {settings.CARD_BATCH_MAX_IDS} IDs can be requested at once.')
+        return ids
+
+
 class CardSerializer(serializers.ModelSerializer):
+    """
+    Accepts an optional `fields` argument restricting the output to a subset of Meta.fields,
+    so narrow consumers only pay for the columns they asked for.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = Card
         fields = ['id', 'status', 'color', 'expiration_date', 'created_at', 'updated_at']
         read_only_fields = ['id', 'status', 'color', 'expiration_date', 'created_at', 'updated_at']
+
+
+def parse_sparse_fields(value):
+    """
+    Parse the comma-separated `fields=` query parameter into a list of CardSerializer fields.
+    Returns None when the parameter is absent so callers fall back to the full representation.
+    """
+    if value is None:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in CardSerializer.Meta.fields]
+    if not fields or unknown:
+        raise serializers.ValidationError({
+            'fields': [f"Choose from: {', '.join(CardSerializer.Meta.fields)}."],
+        })
+    return fields
@@ -1,17 +1,40 @@
-from .models import Card
+import heapq
+from .models import ArchivedCard, Card, status_spellings
 from users.models import CustomUser
 from providers.clients.bank_provider import BankProviderClient
+from providers.retry import provider_caller
+from providers.routing import get_provider_router
+from providers.registration_cache import UnregisteredUserCache
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from dateutil.parser import isoparse
+from backend.tracing import traced
 import requests
+from .throttling import ProviderQuota
 from .exceptions import UserNotRegisteredError, ProviderFailureError, InvalidCardDataError, InvalidInputError, CardNotFoundError
 
+# Maps the validated list filters (see CardFilterSerializer) to ORM lookups.
+CARD_FILTER_LOOKUPS = {
+    'color': 'color',
+    'expiration_date_after': 'expiration_date__gte',
+    'expiration_date_before': 'expiration_date__lte',
+    'created_at_after': 'created_at__gte',
+    'created_at_before': 'created_at__lte',
+}
+
+
+def status_variants(statuses):
+    """Expand status values to every spelling stored in the database (see status_spellings)."""
+    return sorted(set().union(*(status_spellings(value) for value in statuses)))
+
+
 class CardService:
     """
     Service layer for card-related business logic. Handles creation, retrieval, and integration with external providers.
     """
     @staticmethod
+    @traced('CardService.create_card')
     def create_card(user: CustomUser, color: str):
         """
         Create a new card for the given user with the specified color.
@@ -21,11 +44,24 @@ class CardService:
 
         provider_external_id = user.external_id
 
-        provider_client = BankProviderClient()
+        # Users the provider recently rejected are answered locally instead of calling it again.
+        if UnregisteredUserCache.contains(provider_external_id):
+            raise UserNotRegisteredError()
+
+        # Only requests that will reach the provider count against its quota, so this must stay after
+        # the cached answer above: a client looping on it must not use up other users' capacity.
+        ProviderQuota().acquire()
+
+        def issue(endpoint):
+            return BankProviderClient(base_url=endpoint.base_url).create_card(provider_external_id, color)
+
         try:
-            provider_response = provider_client.create_card(provider_external_id, color)
+            # Each attempt goes to the fastest healthy endpoint, and transient failures are
+            # retried with backoff (possibly on another endpoint) before they reach the user.
+            endpoint, provider_response = provider_caller.call('create_card', get_provider_router().call, issue)
         except requests.exceptions.HTTPError as exc:
             if exc.response.status_code == 400:
+                UnregisteredUserCache.add(provider_external_id)
                 raise UserNotRegisteredError()
             elif exc.response.status_code >= 500:
                 raise ProviderFailureError()
@@ -62,6 +98,7 @@ class CardService:
                     external_id=provider_response.get("id"),
                     expiration_date=expiration_date,
                     status=provider_response["status"],
+                    provider=endpoint.name,
                 )
         except Exception as exc:
             # logger.error(f"Database error during card creation: {exc}")
@@ -70,19 +107,71 @@ class CardService:
         return card
 
     @staticmethod
-    def list_user_cards(user: CustomUser):
+    @traced('CardService.list_user_cards')
+    def list_user_cards(user: CustomUser, filters: dict = None, fields: list = None, include_archived: bool = False):
         """
-        Return all cards belonging to the given user.
+        Return the cards belonging to the given user, optionally narrowed by `filters`
+        as validated by CardFilterSerializer. Every supported filter combination is
+        served by one of the indexes declared on Card.Meta.
+        When `fields` is given, only those columns are loaded from the database.
+        With `include_archived`, matching archived cards are merged in, newest first, and a list
+        is returned instead of a queryset.
         """
-        return Card.objects.filter(user=user)
+        conditions = Q(user=user)
+        if filters and filters.get('status'):
+            conditions &= Q(status__in=status_variants(filters['status']))
+        for name, lookup in CARD_FILTER_LOOKUPS.items():
+            if filters and filters.get(name) is not None:
+                conditions &= Q(**{lookup: filters[name]})
+
+        cards = Card.objects.filter(conditions)
+        if not include_archived:
+            return cards.only(*fields) if fields else cards
+
+        # Both tables are read in -created_at order, so merging keeps the listing order.
+        archived = ArchivedCard.objects.filter(conditions)
+        if fields:
+            cards, archived = cards.only(*fields, 'created_at'), archived.only(*fields, 'created_at')
+        return list(heapq.merge(cards, archived, key=lambda card: card.created_at, reverse=True))
 
     @staticmethod
-    def retrieve_user_card(user: CustomUser, pk: int):
+    def retrieve_user_cards(user: CustomUser, ids: list, fields: list = None) -> dict:
+        """
+        Fetch several of the user's cards in one primary-key `IN (...)` query.
+        Returns a mapping of id to card; ids that don't exist or belong to someone else are absent.
+        """
+        cards = Card.objects.filter(user=user, pk__in=ids).order_by()
+        if fields:
+            cards = cards.only(*fields)
+        return {card.pk: card for card in cards}
+
+    @staticmethod
+    def export_cards(user: CustomUser = None, include_archived: bool = True) -> list:
+        """
+        Return the querysets to export: the given user's cards, or every card when no user is given.
+        Archived cards are included by default, since exports serve compliance and must be complete.
+        Global exports walk the primary key index so no sort is needed over the whole table.
+        """
+        models = [Card, ArchivedCard] if include_archived else [Card]
+        if user is None:
+            return [model.objects.order_by('pk') for model in models]
+        return [model.objects.filter(user=user) for model in models]
+
+    @staticmethod
+    @traced('CardService.retrieve_user_card')
+    def retrieve_user_card(user: CustomUser, pk: int, fields: list = None, include_archived: bool = False):
         """
         Retrieve a specific card by primary key, ensuring it belongs to the given user.
+        When `fields` is given, only those columns are loaded from the database.
+        With `include_archived`, a card that has been archived is returned too.
         Raises CardNotFoundError if not found.
         """
-        try:
-            return Card.objects.get(pk=pk, user=user)
-        except Card.DoesNotExist:
-            raise CardNotFoundError() 
\ No newline at end of file
+        for model in ([Card, ArchivedCard] if include_archived else [Card]):
+            cards = model.objects.all()
+            if fields:
+                cards = cards.only(*fields)
+            try:
+                return cards.get(pk=pk, user=user)
+            except model.DoesNotExist:
+                pass
+        raise CardNotFoundError()
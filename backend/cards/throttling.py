@@ -0,0 +1,159 @@
+import logging
+import math
+import threading
+import time
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from .exceptions import RateLimitedError
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: str):
+    """Parse a DRF-style rate such as '10/min' into (requests, seconds)."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class LocalCounterStore:
+    """In-process counters used when the shared cache is unreachable."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def incr(self, key, delta, timeout):
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._counters.get(key, (0, 0))
+            if expires <= now:
+                value = 0
+            value += delta
+            self._counters[key] = (value, now + timeout)
+            if len(self._counters) > 10000:
+                self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+            return value
+
+    def get(self, key):
+        value, expires = self._counters.get(key, (0, 0))
+        return value if expires > time.monotonic() else 0
+
+
+class SlidingWindowCounter:
+    """
+    Sliding-window rate counter built from two fixed-window counters in the shared cache.
+    The estimate weights the previous window by how much of it still overlaps the sliding window.
+    Increments use the cache's atomic incr(), so limits hold across worker processes; if the cache
+    fails, counting falls back to per-process counters rather than rejecting or allowing everything.
+    """
+    local_store = LocalCounterStore()
+
+    def __init__(self, cache_alias='default'):
+        self.cache = caches[cache_alias]
+
+    def _incr(self, key, delta, timeout):
+        try:
+            try:
+                return self.cache.incr(key, delta)
+            except ValueError:
+                if self.cache.add(key, delta, timeout):
+                    return delta
+                return self.cache.incr(key, delta)
+        except Exception:
+            logger.warning("Rate limit cache unavailable, using local counters", exc_info=True)
+            return self.local_store.incr(key, delta, timeout)
+
+    def _get(self, key):
+        try:
+            return self.cache.get(key, 0)
+        except Exception:
+            return self.local_store.get(key)
+
+    def hit(self, key: str, limit: int, duration: int, now: float):
+        """
+        Count one request against `key` and return (allowed, wait_seconds).
+        Rejected requests are not counted, so they don't extend the caller's wait.
+        """
+        window, offset = divmod(now, duration)
+        elapsed = offset / duration
+        current_key, previous_key = self.window_key(key, duration, now), f'{key}:{int(window) - 1}'
+
+        current = self._incr(current_key, 1, duration * 2)
+        previous = self._get(previous_key)
+        if previous * (1 - elapsed) + current <= limit:
+            return True, 0
+
+        self.undo(key, duration, now)
+        current -= 1
+        if current + 1 <= limit and previous:
+            # Wait until enough of the previous window has slid out.
+            needed = 1 - (limit - current - 1) / previous
+            wait = (needed - elapsed) * duration
+        else:
+            # Wait for the next window, in which this window's count becomes "previous".
+            needed = max(0, 1 - (limit - 1) / current) if current else 0
+            wait = (1 - elapsed + needed) * duration
+        return False, max(1, math.ceil(wait))
+
+    def undo(self, key: str, duration: int, now: float):
+        """Refund a request previously counted by hit() at time `now`."""
+        self._incr(self.window_key(key, duration, now), -1, duration * 2)
+
+    @staticmethod
+    def window_key(key, duration, now):
+        return f'{key}:{int(now // duration)}'
+
+
+class CardIssuanceThrottle(BaseThrottle):
+    """
+    Limits card issuance requests per user, at REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+    ['card_issuance_user']; a missing rate disables the limit.
+    The provider's global quota is not checked here: DRF runs throttles before the request body
+    is validated, so ProviderQuota is charged by the service just before the provider is called.
+    """
+    scope = 'card_issuance_user'
+    cache_prefix = 'throttle'
+    timer = time.time
+
+    def __init__(self):
+        self.counter = SlidingWindowCounter()
+        self._wait = None
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if not rate:
+            return True
+        limit, duration = parse_rate(rate)
+        key = f'{self.cache_prefix}:{self.scope}:user:{request.user.pk}'
+        allowed, self._wait = self.counter.hit(key, limit, duration, self.timer())
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class ProviderQuota:
+    """
+    Global bucket protecting the provider's card issuance quota, shared by all users, at
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['card_issuance_provider']; a missing rate disables it.
+    A token is only taken right before the provider is called, so requests answered locally
+    (invalid input, cached "not registered" answers) leave the quota to other users.
+    """
+    scope = 'card_issuance_provider'
+    key = f'throttle:{scope}:global'
+    timer = time.time
+
+    def __init__(self):
+        self.counter = SlidingWindowCounter()
+
+    def acquire(self):
+        """Take one token, raising RateLimitedError with the time to wait when the quota is used up."""
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if not rate:
+            return
+        limit, duration = parse_rate(rate)
+        allowed, wait = self.counter.hit(self.key, limit, duration, self.timer())
+        if not allowed:
+            raise RateLimitedError(wait)
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CardViewSet
+from .views import CardViewSet, card_status_events
 
 router = DefaultRouter()
 router.register(r'cards', CardViewSet, basename='card')
 
 urlpatterns = [
+    # Must precede the router, whose detail route would otherwise read "events" as a card id.
+    path('cards/events/', card_status_events, name='card-events'),
     path('', include(router.urls)),
 ]
@@ -1,22 +1,112 @@
-import uuid
-from rest_framework import viewsets, status, permissions
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework import viewsets, status, permissions, serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
 from .models import Card
-from .serializers import CardSerializer, CardCreateSerializer
+from .serializers import (
+    CardSerializer, CardCreateSerializer, CardFilterSerializer, CardExportSerializer, CardBatchSerializer,
+    CardRetrieveSerializer, parse_sparse_fields,
+)
 from .services import CardService
-from .exceptions import ServiceException
+from .exports import CardExporter
+from .notifications import CardStatusListener
+from .exceptions import ServiceException, RateLimitedError, CardNotFoundError
+from .throttling import CardIssuanceThrottle
+from backend.tracing import current_trace_id, get_tracer
 from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+fields_parameter = openapi.Parameter(
+    'fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description="Comma-separated subset of card fields to return, e.g. 'id,status'.",
+)
 
 class CardViewSet(viewsets.ViewSet):
     """API endpoint that allows cards to be viewed or edited."""
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_throttles(self):
+        """Only card issuance is rate limited, since it is the only call that reaches the provider."""
+        if self.action == 'create':
+            return [CardIssuanceThrottle()]
+        return super().get_throttles()
+
+    def throttled(self, request, wait):
+        raise RateLimitedError(wait)
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower(), request.method.lower())
+        with get_tracer().start_span(f'CardViewSet.{action}'):
+            return super().dispatch(request, *args, **kwargs)
+
+    @swagger_auto_schema(query_serializer=CardFilterSerializer, manual_parameters=[fields_parameter])
     def list(self, request):
-        """Get all cards for the authenticated user using the service layer."""
-        cards = CardService.list_user_cards(request.user)
-        serializer = CardSerializer(cards, many=True)
+        """Get the authenticated user's cards, optionally filtered, using the service layer."""
+        filter_serializer = CardFilterSerializer(data=request.query_params)
+        if not filter_serializer.is_valid():
+            return Response(filter_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = parse_sparse_fields(request.query_params.get('fields'))
+        except serializers.ValidationError as exc:
+            return Response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = dict(filter_serializer.validated_data)
+        include_archived = filters.pop('include_archived')
+        cards = CardService.list_user_cards(request.user, filters, fields=fields, include_archived=include_archived)
+        serializer = CardSerializer(cards, many=True, fields=fields)
         return Response(serializer.data)
 
+    @swagger_auto_schema(query_serializer=CardBatchSerializer, manual_parameters=[fields_parameter])
+    @action(detail=False, methods=['get'], url_path='batch-get')
+    def batch_get(self, request):
+        """
+        Get several of the authenticated user's cards in one round trip. Results follow the
+        requested order; missing cards are reported in place with the card_not_found error shape.
+        """
+        batch_serializer = CardBatchSerializer(data=request.query_params)
+        if not batch_serializer.is_valid():
+            return Response(batch_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = parse_sparse_fields(request.query_params.get('fields'))
+        except serializers.ValidationError as exc:
+            return Response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = batch_serializer.validated_data['ids']
+        cards = CardService.retrieve_user_cards(request.user, ids, fields=fields)
+        results = []
+        for card_id in ids:
+            if card_id in cards:
+                results.append(CardSerializer(cards[card_id], fields=fields).data)
+            else:
+                results.append({'id': card_id, **CardNotFoundError.default_detail})
+        return Response(results)
+
+    @swagger_auto_schema(query_serializer=CardExportSerializer)
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the authenticated user's cards (or every card, for staff) as NDJSON or CSV."""
+        export_serializer = CardExportSerializer(data=request.query_params)
+        if not export_serializer.is_valid():
+            return Response(export_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = export_serializer.validated_data
+
+        if params['scope'] == 'all' and not request.user.is_staff:
+            return Response({'detail': 'Only staff can export all cards.'}, status=status.HTTP_403_FORBIDDEN)
+
+        cards = CardService.export_cards(None if params['scope'] == 'all' else request.user)
+        exporter = CardExporter(cards, params['export_format'])
+        response = StreamingHttpResponse(exporter.alines(), content_type=exporter.content_type)
+        response['Content-Disposition'] = f'attachment; filename="cards.{params["export_format"]}"'
+        return response
+
     @swagger_auto_schema(request_body=CardCreateSerializer)
     def create(self, request):
         """Create a new card for the authenticated user using the service layer."""
@@ -29,35 +119,94 @@ class CardViewSet(viewsets.ViewSet):
         try:
             card = CardService.create_card(request.user, color)
         except ServiceException as exc:
-            trace_id = uuid.uuid4()
+            trace_id = current_trace_id()
             # logger.error(f"Service error [trace_id: {trace_id}]: {exc.detail}")
             error_response = exc.detail
-            error_response['trace_id'] = str(trace_id)
-            return Response(error_response, status=exc.status_code)
+            error_response['trace_id'] = trace_id
+            # As DRF's exception handler does for throttled requests.
+            headers = {'Retry-After': '%d' % exc.wait} if getattr(exc, 'wait', None) else None
+            return Response(error_response, status=exc.status_code, headers=headers)
         except Exception as exc:
-            trace_id = uuid.uuid4()
+            trace_id = current_trace_id()
             # logger.error(f"Unexpected error [trace_id: {trace_id}]: {exc}")
             return Response({'detail': 'An unexpected error occurred.', 'trace_id': trace_id}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         output_serializer = CardSerializer(card)
         return Response(output_serializer.data, status=status.HTTP_201_CREATED)
 
+    @swagger_auto_schema(query_serializer=CardRetrieveSerializer, manual_parameters=[fields_parameter])
     def retrieve(self, request, pk=None):
         """Get a specific card belonging to the authenticated user using the service layer. Ensures ownership and safe error handling."""
+        params_serializer = CardRetrieveSerializer(data=request.query_params)
+        if not params_serializer.is_valid():
+            return Response(params_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = parse_sparse_fields(request.query_params.get('fields'))
+        except serializers.ValidationError as exc:
+            return Response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            card = CardService.retrieve_user_card(request.user, pk)
+            card = CardService.retrieve_user_card(
+                request.user, pk, fields=fields, include_archived=params_serializer.validated_data['include_archived'],
+            )
         except ServiceException as exc:
-            trace_id = uuid.uuid4()
+            trace_id = current_trace_id()
             # logger.error(f"Service error [trace_id: {trace_id}]: {exc.detail}")
             error_response = exc.detail
-            error_response['trace_id'] = str(trace_id)
+            error_response['trace_id'] = trace_id
             return Response(error_response, status=exc.status_code)
         except Exception as exc:
             # Log the error internally (placeholder for actual logging)
             # logger.error(f"Error retrieving card [trace_id: {trace_id}]: {exc}")
-            trace_id = uuid.uuid4()
+            trace_id = current_trace_id()
             return Response({'detail': 'An unexpected error occurred.', 'trace_id': trace_id}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        serializer = CardSerializer(card)
+        serializer = CardSerializer(card, fields=fields)
         return Response(serializer.data)
 
 
+async def _authenticate_stream(request):
+    """Resolve the user of a streaming request from a JWT bearer token, falling back to the session."""
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        # Invalid or expired tokens and malformed Authorization headers.
+        return None
+    if result is not None:
+        return result[0]
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+async def _card_status_stream(listener, user_id):
+    subscription = listener.subscribe(user_id)
+    try:
+        yield f'retry: {settings.CARD_EVENTS_RETRY_MS}\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.CARD_EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment lines keep proxies from closing an idle connection.
+                yield ': keep-alive\n\n'
+                continue
+            yield f"id: {event['id']}:{event['version']}\nevent: card_status\ndata: {json.dumps(event)}\n\n"
+    finally:
+        listener.unsubscribe(subscription)
+
+
+@require_GET
+async def card_status_events(request):
+    """
+    Server-Sent Events stream of status changes for the authenticated user's cards, so clients
+    no longer poll the retrieve endpoint. Served by the ASGI application; every connection in
+    the process shares one LISTEN connection through CardStatusListener.
+    """
+    user = await _authenticate_stream(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    response = StreamingHttpResponse(
+        _card_status_stream(CardStatusListener.get(), user.pk), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
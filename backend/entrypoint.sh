@@ -32,6 +32,8 @@ END
 # Update superuser with external_id
 python manage.py update_superuser --external-id="${DJANGO_SUPERUSER_EXTERNAL_ID:-super_user_id_123}"
 
-# Start the Django development server
+# Start the server given as the container command (uvicorn by default, see the Dockerfile).
+# The app must run under ASGI: card status events and exports stream asynchronously, and a
+# WSGI server such as runserver would buffer those responses instead of streaming them.
 echo "Starting Django server..."
-exec python manage.py runserver 0.0.0.0:8000 
\ No newline at end of file
+exec "$@"
@@ -1,10 +1,17 @@
 import requests
 from datetime import datetime, timedelta
+from urllib.parse import urljoin
+from backend.tracing import get_tracer
 
 
 class BankProviderClient:
     base_url = "https://bankprovider.com/"
 
+    def __init__(self, base_url: str = None):
+        # Endpoints are chosen per call by providers.routing; the class default is the primary one.
+        if base_url:
+            self.base_url = base_url
+
     def create_card(self, user_external_id: str, color: str) -> dict:
         """
         ----------
@@ -25,6 +32,19 @@ class BankProviderClient:
          - 500: {"error": "Provider internal error"}
          ------------
         """
+        url = urljoin(self.base_url, "api/v2/card/")
+        attributes = {"http.request.method": "POST", "url.full": url}
+        with get_tracer().start_span("POST /api/v2/card/", kind="client", attributes=attributes) as span:
+            # A real request would send span.traceparent in the "traceparent" header.
+            try:
+                response = self._create_card(user_external_id, color)
+            except requests.exceptions.HTTPError as exc:
+                span.set_attribute("http.response.status_code", getattr(exc.response, "status_code", None))
+                raise
+            span.set_attribute("http.response.status_code", 201)
+            return response
+
+    def _create_card(self, user_external_id: str, color: str) -> dict:
         # Simulate API call
         if user_external_id == "invalid_user_id":
             raise requests.exceptions.HTTPError("User not found at provider", response=type('obj', (object,), {'status_code': 400})())
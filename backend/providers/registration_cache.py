@@ -0,0 +1,60 @@
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+
+class UnregisteredUserCache:
+    """
+    Short-lived negative cache of user external IDs the provider rejected as unregistered.
+    Repeated issuance attempts for a known-bad user are answered locally instead of costing a
+    provider round trip. Entries must be invalidated whenever a user's external_id changes.
+    Invalidation only reaches every process when the cache is shared (Redis, via REDIS_URL);
+    with the in-memory fallback, other processes keep their entries until
+    PROVIDER_UNREGISTERED_CACHE_TTL expires.
+    Cache errors are treated as misses so issuance never depends on the cache being up.
+    """
+    key_prefix = 'provider:unregistered'
+
+    @classmethod
+    def key(cls, external_id) -> str:
+        digest = hashlib.sha256((external_id or '').encode()).hexdigest()
+        return f'{cls.key_prefix}:{digest}'
+
+    @staticmethod
+    def is_shared() -> bool:
+        """Whether other processes, such as web workers and management commands, see the same entries."""
+        return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+    @staticmethod
+    def unshared_warning() -> str:
+        """Warning for management commands, whose invalidations do not reach the web workers' caches."""
+        return (
+            'The cache is local to this process (REDIS_URL is not set), so running web workers keep '
+            f'cached "user not registered" answers for up to {settings.PROVIDER_UNREGISTERED_CACHE_TTL} seconds.'
+        )
+
+    @classmethod
+    def contains(cls, external_id) -> bool:
+        try:
+            return cache.get(cls.key(external_id)) is not None
+        except Exception:
+            logger.warning("Unregistered user cache unavailable", exc_info=True)
+            return False
+
+    @classmethod
+    def add(cls, external_id):
+        try:
+            cache.set(cls.key(external_id), True, timeout=settings.PROVIDER_UNREGISTERED_CACHE_TTL)
+        except Exception:
+            logger.warning("Unregistered user cache unavailable", exc_info=True)
+
+    @classmethod
+    def invalidate(cls, *external_ids):
+        try:
+            cache.delete_many([cls.key(external_id) for external_id in set(external_ids)])
+        except Exception:
+            logger.warning("Unregistered user cache unavailable", exc_info=True)
@@ -0,0 +1,216 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, fields
+from django.conf import settings
+import requests
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How one provider operation is retried.
+    Delays use exponential backoff with full jitter: attempt n sleeps a random time in
+    [0, min(max_delay, base_delay * 2 ** n)]. When `hedge` is on, a second identical request
+    is sent if the first is still running after the operation's `hedge_quantile` latency.
+
+    Which failures are retried is part of the policy too. Failures that prove the request never
+    reached the provider are always retried. HTTP errors are retried when their status is in
+    `retry_statuses`. Read timeouts and dropped connections may arrive after the provider acted,
+    so they are retried only when `retry_ambiguous` is on. Non-idempotent operations such as
+    create_card must turn it off, or a retry can repeat the side effect.
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 2.0
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 50
+    retry_statuses: tuple = (500, 502, 503, 504)
+    retry_ambiguous: bool = True
+
+    @classmethod
+    def for_operation(cls, operation: str):
+        """Build the policy for `operation` from settings.PROVIDER_RETRY_POLICIES."""
+        policies = getattr(settings, 'PROVIDER_RETRY_POLICIES', {})
+        options = {**policies.get('default', {}), **policies.get(operation, {})}
+        known = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in options.items() if key in known})
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def should_retry(self, exc: Exception) -> bool:
+        if isinstance(exc, requests.exceptions.HTTPError):
+            return getattr(exc.response, 'status_code', None) in self.retry_statuses
+        if never_sent(exc):
+            return True
+        return self.retry_ambiguous and is_retryable(exc)
+
+
+def never_sent(exc: Exception) -> bool:
+    """True when the connection was never established, so the provider cannot have processed the request."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError) and exc.args:
+        return isinstance(getattr(exc.args[0], 'reason', None), NewConnectionError)
+    return False
+
+
+def is_retryable(exc: Exception) -> bool:
+    """
+    Connection problems, timeouts and 5xx responses are transient; anything else is final.
+    This says whether a failure is the provider's (it is used for endpoint health); whether
+    an operation may be retried after it is decided by RetryPolicy.should_retry.
+    """
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(exc, requests.exceptions.HTTPError):
+        status_code = getattr(exc.response, 'status_code', None)
+        return status_code is not None and status_code >= 500
+    return False
+
+
+class RetryBudget:
+    """
+    Process-wide cap on extra attempts (retries and hedges) so a provider outage does not
+    multiply our traffic. Over the last `window` seconds, extra attempts may not exceed
+    `ratio` of first attempts, plus a small `min_per_second` reserve for low traffic.
+    """
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, window: int = 10):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._lock = threading.Lock()
+        self._buckets = {}  # second -> [calls, extra attempts]
+
+    def _bucket(self, now):
+        second = int(now)
+        for stale in [key for key in self._buckets if key <= second - self.window]:
+            del self._buckets[stale]
+        return self._buckets.setdefault(second, [0, 0])
+
+    def record_call(self):
+        with self._lock:
+            self._bucket(time.monotonic())[0] += 1
+
+    def try_acquire(self) -> bool:
+        """Reserve one extra attempt, returning False when the budget is exhausted."""
+        with self._lock:
+            bucket = self._bucket(time.monotonic())
+            calls = sum(counts[0] for counts in self._buckets.values())
+            extra = sum(counts[1] for counts in self._buckets.values())
+            if extra + 1 > self.ratio * calls + self.min_per_second * self.window:
+                return False
+            bucket[1] += 1
+            return True
+
+
+class AttemptStats:
+    """Rolling per-operation latency samples of provider attempts, used for hedging and monitoring."""
+    def __init__(self, size: int = 1000):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=size))
+        self._outcomes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, operation: str, attempt: int, duration: float, outcome: str):
+        with self._lock:
+            if outcome == 'success':
+                self._latencies[operation].append(duration)
+            self._outcomes[operation][outcome] += 1
+        logger.info(
+            "provider attempt operation=%s attempt=%d outcome=%s duration_ms=%.1f",
+            operation, attempt, outcome, duration * 1000,
+        )
+
+    def quantile(self, operation: str, q: float, min_samples: int = 1):
+        """Latency (in seconds) below which `q` of successful attempts completed, if known."""
+        with self._lock:
+            samples = sorted(self._latencies[operation])
+        if len(samples) < max(min_samples, 1):
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def snapshot(self, operation: str) -> dict:
+        with self._lock:
+            outcomes = dict(self._outcomes[operation])
+        return {
+            'outcomes': outcomes,
+            'p50': self.quantile(operation, 0.5),
+            'p95': self.quantile(operation, 0.95),
+        }
+
+
+class RetryingCaller:
+    """
+    Runs provider calls under their operation's RetryPolicy, a shared RetryBudget and
+    optional hedging. The last error is re-raised unchanged once attempts run out, so
+    callers keep translating provider errors exactly as for a single call.
+    """
+    def __init__(self, budget: RetryBudget = None, stats: AttemptStats = None, max_workers: int = 16):
+        self.budget = budget or RetryBudget()
+        self.stats = stats or AttemptStats()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='provider-hedge')
+
+    def call(self, operation: str, func, *args, **kwargs):
+        policy = RetryPolicy.for_operation(operation)
+        self.budget.record_call()
+        attempt = 1
+        while True:
+            try:
+                return self._attempt(operation, policy, attempt, func, args, kwargs)
+            except Exception as exc:
+                if not policy.should_retry(exc) or attempt >= policy.max_attempts:
+                    raise
+                if not self.budget.try_acquire():
+                    logger.warning("provider retry budget exhausted operation=%s", operation)
+                    raise
+            time.sleep(policy.backoff(attempt))
+            attempt += 1
+
+    def _attempt(self, operation, policy, attempt, func, args, kwargs):
+        threshold = policy.hedge and self.stats.quantile(operation, policy.hedge_quantile, policy.hedge_min_samples)
+        if not threshold:
+            return self._timed(operation, attempt, func, args, kwargs)
+
+        # Run each attempt in a copy of the caller's context so its trace spans keep their parent.
+        pending = {self._executor.submit(
+            contextvars.copy_context().run, self._timed, operation, attempt, func, args, kwargs,
+        )}
+        done, _ = wait(pending, timeout=threshold)
+        if not done and self.budget.try_acquire():
+            pending.add(self._executor.submit(
+                contextvars.copy_context().run, self._timed, operation, attempt, func, args, kwargs, True,
+            ))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _timed(self, operation, attempt, func, args, kwargs, hedged=False):
+        started = time.perf_counter()
+        outcome = 'success'
+        try:
+            return func(*args, **kwargs)
+        except Exception as exc:
+            outcome = 'retryable_error' if is_retryable(exc) else 'error'
+            raise
+        finally:
+            label = f'{operation}.hedge' if hedged else operation
+            self.stats.record(label, attempt, time.perf_counter() - started, outcome)
+
+
+# Shared by every provider call in this process, so the retry budget is process-wide.
+provider_caller = RetryingCaller()
@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .retry import is_retryable
+
+
+@dataclass(frozen=True)
+class ProviderEndpoint:
+    """One deployment of the card provider API, e.g. a region."""
+    name: str
+    base_url: str
+    region: str = ''
+    weight: float = 1.0
+
+
+class ProviderRegistry:
+    """The provider endpoints configured in settings.BANK_PROVIDER_ENDPOINTS."""
+    def __init__(self, endpoints):
+        if not endpoints:
+            raise ValueError("At least one provider endpoint must be configured.")
+        self.endpoints = list(endpoints)
+        self._by_name = {endpoint.name: endpoint for endpoint in self.endpoints}
+        if len(self._by_name) != len(self.endpoints):
+            raise ValueError("Provider endpoint names must be unique.")
+
+    @classmethod
+    def from_settings(cls):
+        return cls(ProviderEndpoint(**options) for options in settings.BANK_PROVIDER_ENDPOINTS)
+
+    def get(self, name: str) -> ProviderEndpoint:
+        return self._by_name[name]
+
+
+class EndpointHealth:
+    """Exponentially weighted moving averages of one endpoint's latency and error rate."""
+    def __init__(self):
+        self.samples = 0
+        self.latency = 0.0
+        self.error_rate = 0.0
+
+    def observe(self, latency: float, ok: bool, alpha: float):
+        error = 0.0 if ok else 1.0
+        if self.samples == 0:
+            self.latency, self.error_rate = latency, error
+        else:
+            self.latency += alpha * (latency - self.latency)
+            self.error_rate += alpha * (error - self.error_rate)
+        self.samples += 1
+
+
+class ProviderRouter:
+    """
+    Sends each provider call to the endpoint with the best live estimates.
+    Endpoints whose EWMA error rate exceeds `max_error_rate` are skipped while any other is healthy.
+    Among the rest, the lowest EWMA latency divided by weight wins. Endpoints with no samples are
+    tried first, and a small `explore_ratio` of calls goes to a random endpoint, so a slow or
+    failing endpoint's estimates keep updating and it can win traffic back once it recovers.
+    """
+    def __init__(self, registry: ProviderRegistry, alpha: float = 0.2, max_error_rate: float = 0.5,
+                 explore_ratio: float = 0.05):
+        self.registry = registry
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.explore_ratio = explore_ratio
+        self._lock = threading.Lock()
+        self._health = {endpoint.name: EndpointHealth() for endpoint in registry.endpoints}
+
+    @classmethod
+    def from_settings(cls):
+        return cls(ProviderRegistry.from_settings(), **settings.BANK_PROVIDER_ROUTING)
+
+    def choose(self) -> ProviderEndpoint:
+        endpoints = self.registry.endpoints
+        if len(endpoints) == 1:
+            return endpoints[0]
+        with self._lock:
+            unexplored = [e for e in endpoints if self._health[e.name].samples == 0]
+            if unexplored:
+                return random.choice(unexplored)
+            if random.random() < self.explore_ratio:
+                return random.choice(endpoints)
+            healthy = [e for e in endpoints if self._health[e.name].error_rate <= self.max_error_rate] or endpoints
+            return min(healthy, key=lambda e: self._health[e.name].latency / e.weight)
+
+    def observe(self, endpoint: ProviderEndpoint, latency: float, ok: bool):
+        with self._lock:
+            self._health[endpoint.name].observe(latency, ok, self.alpha)
+
+    def call(self, func):
+        """
+        Run `func(endpoint)` against the chosen endpoint and record how it went.
+        Returns (endpoint, result). Only transient failures count against the endpoint's
+        health; a client error such as a 400 says nothing about the endpoint itself.
+        """
+        endpoint = self.choose()
+        started = time.perf_counter()
+        try:
+            result = func(endpoint)
+        except Exception as exc:
+            self.observe(endpoint, time.perf_counter() - started, ok=not is_retryable(exc))
+            raise
+        self.observe(endpoint, time.perf_counter() - started, ok=True)
+        return endpoint, result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {'samples': h.samples, 'latency': h.latency, 'error_rate': h.error_rate}
+                for name, h in self._health.items()
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_provider_router() -> ProviderRouter:
+    """The process-wide router, built from settings on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ProviderRouter.from_settings()
+        return _router
+
+
+@receiver(setting_changed)
+def _reset_router(setting, **kwargs):
+    global _router
+    if setting in ('BANK_PROVIDER_ENDPOINTS', 'BANK_PROVIDER_ROUTING'):
+        with _router_lock:
+            _router = None
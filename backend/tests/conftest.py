@@ -1,7 +1,16 @@
 import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from tests.factories import UserFactory, CardFactory
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Rate-limit counters and other cached state must not leak between tests."""
+    cache.clear()
+    yield
+    cache.clear()
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -17,4 +26,11 @@ def auth_client(api_client, user):
 
 @pytest.fixture
 def card(user):
-    return CardFactory(user=user) 
\ No newline at end of file
+    return CardFactory(user=user)
+
+@pytest.fixture
+def read_stream():
+    """Collect the body of a streaming response whose content is an async iterator."""
+    async def collect(response):
+        return b"".join([chunk async for chunk in response.streaming_content])
+    return async_to_sync(collect)
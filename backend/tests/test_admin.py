@@ -0,0 +1,99 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from backend.paginators import EstimatedCountPaginator
+from cards.models import Card
+from tests.factories import CardFactory, UserFactory
+
+
+@pytest.fixture
+def admin_user_client(client):
+    admin = UserFactory(is_staff=True, is_superuser=True)
+    # The factory skips saving after set_password; persist it so the session auth hash matches.
+    admin.save()
+    client.force_login(admin)
+    return client
+
+
+@pytest.mark.django_db
+class TestAdminChangelists:
+    @pytest.mark.parametrize("url", ["/admin/cards/card/", "/admin/users/customuser/"])
+    def test_changelist_renders(self, admin_user_client, url):
+        """Both changelists render for staff."""
+        CardFactory.create_batch(3)
+        response = admin_user_client.get(url)
+        assert response.status_code == 200
+
+    def test_card_changelist_renders_cards_without_external_id(self, admin_user_client):
+        """Cards the provider returned no ID for are listed under their primary key."""
+        card = CardFactory(external_id=None)
+        response = admin_user_client.get("/admin/cards/card/")
+        assert response.status_code == 200
+        assert str(card) == f"Card {card.pk}"
+
+    def test_card_changelist_query_count_is_constant(self, admin_user_client, django_assert_max_num_queries):
+        """Card owners are joined in, so rendering does not issue one query per row."""
+        CardFactory.create_batch(20)
+        with django_assert_max_num_queries(8):
+            admin_user_client.get("/admin/cards/card/")
+
+    def test_provider_filter_uses_configured_endpoints(self, admin_user_client, settings):
+        """Provider choices come from settings rather than a DISTINCT scan of the cards table."""
+        settings.BANK_PROVIDER_ENDPOINTS = [
+            {"name": "eu", "base_url": "https://eu.bankprovider.com/"},
+            {"name": "us", "base_url": "https://us.bankprovider.com/"},
+        ]
+        eu_card = CardFactory(provider="eu")
+        CardFactory(provider="us")
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_user_client.get("/admin/cards/card/", {"provider": "eu"})
+        assert not any("DISTINCT" in query["sql"] for query in queries.captured_queries)
+        assert list(response.context["cl"].result_list) == [eu_card]
+
+    def test_card_search_is_exact(self, admin_user_client):
+        """Searching by external ID matches exactly, not by substring."""
+        card = CardFactory(external_id="prov_card_1")
+        CardFactory(external_id="prov_card_10")
+        response = admin_user_client.get("/admin/cards/card/", {"q": "prov_card_1"})
+        assert list(response.context["cl"].result_list) == [card]
+
+    def test_card_search_matches_id(self, admin_user_client):
+        """Numeric terms find cards by primary key as well as by external ID."""
+        card = CardFactory(external_id="prov_card_1")
+        CardFactory(external_id="prov_card_2")
+        response = admin_user_client.get("/admin/cards/card/", {"q": str(card.pk)})
+        assert list(response.context["cl"].result_list) == [card]
+
+    def test_user_search_matches_username_or_external_id(self, admin_user_client):
+        """Searching users matches either the username or the external ID."""
+        user = UserFactory(external_id="partner_42")
+        response = admin_user_client.get("/admin/users/customuser/", {"q": "partner_42"})
+        assert list(response.context["cl"].result_list) == [user]
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    def test_small_tables_use_exact_count(self, user):
+        """Below the threshold the paginator falls back to COUNT(*)."""
+        CardFactory.create_batch(3, user=user)
+        assert EstimatedCountPaginator(Card.objects.all(), 10).count == 3
+
+    def test_large_tables_use_statistics(self, settings, user):
+        """Above the threshold the unfiltered count comes from pg_class without a COUNT(*)."""
+        settings.ESTIMATED_COUNT_THRESHOLD = 1
+        CardFactory.create_batch(5, user=user)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE cards_card")
+        with CaptureQueriesContext(connection) as queries:
+            count = EstimatedCountPaginator(Card.objects.all(), 10).count
+        assert count == 5
+        assert not any("COUNT(" in query["sql"] for query in queries.captured_queries)
+
+    def test_filtered_querysets_use_planner_estimate(self, settings, user):
+        """Filtered querysets above the threshold use the planner's row estimate."""
+        settings.ESTIMATED_COUNT_THRESHOLD = 0
+        CardFactory.create_batch(2, user=user)
+        with CaptureQueriesContext(connection) as queries:
+            count = EstimatedCountPaginator(Card.objects.filter(status="ordered"), 10).count
+        assert count >= 1
+        assert queries.captured_queries[0]["sql"].startswith("EXPLAIN")
@@ -0,0 +1,137 @@
+import io
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from cards.archive import CardArchiver
+from cards.exceptions import CardNotFoundError
+from cards.models import ArchivedCard, Card
+from cards.services import CardService
+from tests.factories import CardFactory
+
+OLD = timezone.now() - timezone.timedelta(days=365)
+
+
+def make_card(status, updated_at=OLD, **kwargs):
+    """Create a card last updated at `updated_at` (auto_now would otherwise set it to now)."""
+    card = CardFactory(status=status, **kwargs)
+    Card.objects.filter(pk=card.pk).update(updated_at=updated_at)
+    return card
+
+
+@pytest.mark.django_db
+class TestCardArchiver:
+    @pytest.mark.parametrize("status", ["canceled", "CANCELLED", "EXPIRED", "failed", "DEACTIVATED"])
+    def test_archives_old_terminal_cards(self, status):
+        """Terminal cards in any stored spelling move to the archive with their id and columns."""
+        card = make_card(status, provider="eu")
+        assert sum(CardArchiver(older_than=timezone.timedelta(days=30)).batches()) == 1
+        assert not Card.objects.filter(pk=card.pk).exists()
+        archived = ArchivedCard.objects.get(pk=card.pk)
+        assert (archived.user_id, archived.external_id, archived.status, archived.provider) == (
+            card.user_id, card.external_id, status, "eu",
+        )
+        assert archived.updated_at == OLD
+        assert archived.archived_at is not None
+
+    def test_keeps_live_and_recent_cards(self):
+        """Cards that can still change, and terminal cards updated recently, stay in the hot table."""
+        active = make_card("ACTIVATED")
+        recent = make_card("canceled", updated_at=timezone.now())
+        assert list(CardArchiver(older_than=timezone.timedelta(days=30)).batches()) == []
+        assert set(Card.objects.values_list("pk", flat=True)) == {active.pk, recent.pk}
+        assert not ArchivedCard.objects.exists()
+
+    def test_moves_cards_in_bounded_batches(self):
+        """No batch exceeds batch_size, and archival stops once no candidates remain."""
+        for _ in range(5):
+            make_card("expired")
+        archiver = CardArchiver(older_than=timezone.timedelta(days=30), batch_size=2)
+        assert list(archiver.batches()) == [2, 2, 1]
+        assert ArchivedCard.objects.count() == 5
+
+    def test_max_batches(self):
+        """max_batches caps how much one run archives."""
+        for _ in range(5):
+            make_card("expired")
+        archiver = CardArchiver(older_than=timezone.timedelta(days=30), batch_size=2)
+        assert list(archiver.batches(max_batches=1)) == [2]
+        assert Card.objects.count() == 3
+
+    def test_age_defaults_to_setting(self, settings):
+        """Without an explicit age, CARD_ARCHIVE_AFTER_DAYS applies."""
+        settings.CARD_ARCHIVE_AFTER_DAYS = 400
+        make_card("failed")
+        assert list(CardArchiver().batches()) == []
+
+    def test_candidates_use_terminal_index(self):
+        """Finding archival candidates is an index scan on the partial terminal-status index."""
+        make_card("expired")
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = CardArchiver().candidates(timezone.now()).explain()
+        assert "card_terminal_updated_idx" in plan, plan
+
+    def test_command(self):
+        """archive_cards reports each batch and the total."""
+        for _ in range(3):
+            make_card("canceled")
+        stdout = io.StringIO()
+        call_command("archive_cards", "--older-than-days", "30", "--batch-size", "2", stdout=stdout)
+        output = stdout.getvalue()
+        assert "Archived 2 cards (2 so far)" in output
+        assert "Archived 3 cards" in output
+        assert ArchivedCard.objects.count() == 3
+
+
+@pytest.mark.django_db
+class TestArchivedCardAccess:
+    @pytest.fixture
+    def archived_card(self, user):
+        card = make_card("expired", user=user)
+        list(CardArchiver(older_than=timezone.timedelta(days=30)).batches())
+        return card
+
+    def test_list_excludes_archived_by_default(self, user, archived_card):
+        """Archived cards are not listed unless asked for."""
+        live = CardFactory(user=user)
+        assert list(CardService.list_user_cards(user)) == [live]
+
+    def test_list_merges_archived_newest_first(self, user, archived_card):
+        """include_archived merges both tables in created_at order and applies the filters to both."""
+        live = CardFactory(user=user)
+        Card.objects.filter(pk=live.pk).update(created_at=OLD - timezone.timedelta(days=1))
+        cards = CardService.list_user_cards(user, include_archived=True)
+        assert [card.pk for card in cards] == [archived_card.pk, live.pk]
+        filtered = CardService.list_user_cards(user, {"status": {"expired"}}, include_archived=True)
+        assert [card.pk for card in filtered] == [archived_card.pk]
+
+    def test_list_sparse_fields_with_archived(self, user, archived_card, django_assert_num_queries):
+        """Sparse fieldsets still load the ordering column, so merging does not query per card."""
+        CardFactory.create_batch(3, user=user)
+        with django_assert_num_queries(2):
+            cards = CardService.list_user_cards(user, fields=["id", "status"], include_archived=True)
+        assert len(cards) == 4
+
+    def test_retrieve_archived_card(self, user, archived_card):
+        """Archived cards are found by id only with include_archived."""
+        with pytest.raises(CardNotFoundError):
+            CardService.retrieve_user_card(user, archived_card.pk)
+        found = CardService.retrieve_user_card(user, archived_card.pk, include_archived=True)
+        assert isinstance(found, ArchivedCard)
+
+    def test_retrieve_archived_card_of_other_user(self, archived_card):
+        """Ownership is enforced for archived cards too."""
+        other = CardFactory().user
+        with pytest.raises(CardNotFoundError):
+            CardService.retrieve_user_card(other, archived_card.pk, include_archived=True)
+
+    def test_api_include_archived(self, auth_client, archived_card):
+        """The list and detail endpoints return archived cards only when include_archived=true."""
+        assert auth_client.get("/api/cards/").data == []
+        listed = auth_client.get("/api/cards/", {"include_archived": "true"}).data
+        assert [card["id"] for card in listed] == [archived_card.pk]
+        assert auth_client.get(f"/api/cards/{archived_card.pk}/").status_code == 404
+        response = auth_client.get(f"/api/cards/{archived_card.pk}/", {"include_archived": "true"})
+        assert response.status_code == 200
+        assert response.data["status"] == "expired"
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework_simplejwt.tokens import AccessToken
+from cards.lifecycle import CardLifecycle
+from cards.notifications import CardStatusListener
+from tests.factories import CardFactory
+
+
+def event_payload(card, status):
+    return json.dumps({"id": card.id, "user_id": card.user_id, "status": status, "version": card.version + 1})
+
+
+class TestCardStatusListenerFanOut:
+    def test_dispatch_reaches_only_the_owner(self, mocker):
+        """Events are delivered to every subscriber of the card's owner and nobody else."""
+        listener = CardStatusListener()
+        mocker.patch.object(listener, "start")
+
+        async def scenario():
+            owner_streams = [listener.subscribe(1), listener.subscribe(1)]
+            other = listener.subscribe(2)
+            listener.dispatch(json.dumps({"id": 10, "user_id": 1, "status": "sent", "version": 1}))
+            received = [await asyncio.wait_for(s.queue.get(), 1) for s in owner_streams]
+            await asyncio.sleep(0)
+            return received, other.queue.empty()
+
+        received, other_empty = asyncio.run(scenario())
+        assert [event["status"] for event in received] == ["sent", "sent"]
+        assert other_empty
+
+    def test_malformed_payload_is_ignored(self):
+        """Payloads without a user id are dropped instead of breaking the listener."""
+        CardStatusListener().dispatch("not json")
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCardStatusNotifications:
+    def test_status_change_is_notified(self, user):
+        """A committed status change reaches subscribers through LISTEN/NOTIFY."""
+        card = CardFactory(user=user, status="ordered")
+        listener = CardStatusListener()
+
+        async def scenario():
+            subscription = listener.subscribe(user.id)
+            await asyncio.get_running_loop().run_in_executor(None, listener.listening.wait, 5)
+            await asyncio.get_running_loop().run_in_executor(None, CardLifecycle.transition, card.id, "sent")
+            return await asyncio.wait_for(subscription.queue.get(), 5)
+
+        try:
+            event = asyncio.run(scenario())
+        finally:
+            listener.stop()
+        assert (event["id"], event["status"], event["version"]) == (card.id, "sent", 1)
+
+
+@pytest.mark.django_db
+class TestCardStatusEventsEndpoint:
+    endpoint = "/api/cards/events/"
+
+    @pytest.fixture
+    def listener(self, mocker):
+        listener = CardStatusListener()
+        mocker.patch.object(listener, "start")
+        mocker.patch.object(CardStatusListener, "get", return_value=listener)
+        return listener
+
+    def test_requires_authentication(self, listener):
+        """Anonymous clients are rejected before a stream is opened."""
+        response = async_to_sync(AsyncClient().get)(self.endpoint)
+        assert response.status_code == 401
+
+    @pytest.mark.parametrize("header", ["Bearer", "Bearer not-a-jwt"])
+    def test_bad_credentials_are_rejected(self, listener, header):
+        """Malformed Authorization headers and invalid tokens get a 401, not a server error."""
+        response = async_to_sync(AsyncClient().get)(self.endpoint, headers={"Authorization": header})
+        assert response.status_code == 401
+
+    def test_streams_status_events(self, listener, user):
+        """Authenticated clients receive their card status changes as SSE messages."""
+        card = CardFactory(user=user)
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+        async def scenario():
+            response = await AsyncClient().get(self.endpoint, headers=headers)
+            stream = response.streaming_content.__aiter__()
+            chunks = [await anext(stream)]
+            listener.dispatch(event_payload(card, "sent"))
+            chunks.append(await asyncio.wait_for(anext(stream), 5))
+            await stream.aclose()
+            return response, chunks
+
+        response, chunks = async_to_sync(scenario)()
+        assert response["Content-Type"] == "text/event-stream"
+        assert chunks[0].startswith(b"retry:")
+        lines = chunks[1].decode().splitlines()
+        assert lines[:2] == [f"id: {card.id}:1", "event: card_status"]
+        assert json.loads(lines[2].removeprefix("data: "))["status"] == "sent"
+        assert not listener._subscribers
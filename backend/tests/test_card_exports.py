@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import threading
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.utils import timezone
+from cards.archive import CardArchiver
+from cards.exports import CardExporter, EXPORT_FIELDS
+from cards.models import ArchivedCard, Card
+from tests.factories import CardFactory
+
+
+@pytest.mark.django_db
+class TestCardExporter:
+    def test_ndjson_lines(self, user, card):
+        """Each card becomes one JSON object per line."""
+        lines = list(CardExporter([Card.objects.filter(user=user)], 'ndjson').lines())
+        assert len(lines) == 1
+        row = json.loads(lines[0])
+        assert row["id"] == card.id
+        assert row["user_id"] == user.id
+        assert set(row) == set(EXPORT_FIELDS)
+
+    def test_csv_lines(self, user):
+        """CSV exports start with a header row followed by one row per card."""
+        CardFactory.create_batch(3, user=user)
+        content = "".join(CardExporter([Card.objects.filter(user=user)], 'csv', chunk_size=2).lines())
+        rows = list(csv.reader(io.StringIO(content)))
+        assert rows[0] == EXPORT_FIELDS
+        assert len(rows) == 4
+
+    @pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+    def test_async_lines_match_sync_lines(self, user, export_format):
+        """alines() streams the same output as lines(), fetching the rows chunk by chunk."""
+        CardFactory.create_batch(5, user=user)
+        exporter = CardExporter([Card.objects.filter(user=user)], export_format, chunk_size=2)
+
+        async def collect():
+            return [line async for line in exporter.alines()]
+
+        assert async_to_sync(collect)() == list(exporter.lines())
+
+    def test_async_lines_close_rows_on_sync_thread(self, user, mocker):
+        """
+        A client that stops reading early closes the row generator on the sync thread that
+        owns the connection, so the export transaction and cursor are released there.
+        """
+        closed_on = []
+
+        def rows():
+            try:
+                yield from [tuple(EXPORT_FIELDS)] * 3
+            finally:
+                closed_on.append(threading.get_ident())
+
+        mocker.patch.object(CardExporter, "rows", lambda self: rows())
+
+        async def read_first_line():
+            lines = CardExporter([Card.objects.none()], chunk_size=1).alines()
+            await lines.__anext__()
+            await lines.aclose()
+
+        async_to_sync(read_first_line)()
+        assert closed_on == [threading.get_ident()]
+
+    def test_unknown_format(self):
+        """Unsupported formats are rejected up front."""
+        with pytest.raises(ValueError):
+            CardExporter([Card.objects.none()], 'xml')
+
+
+@pytest.mark.django_db
+class TestExportCardsCommand:
+    def test_exports_all_cards(self, tmp_path):
+        """Without --username every card is exported."""
+        CardFactory.create_batch(2)
+        CardFactory.create_batch(2)
+        output = tmp_path / "cards.ndjson"
+        call_command("export_cards", "--output", str(output), stderr=io.StringIO())
+        assert len(output.read_text().splitlines()) == 4
+
+    def test_exports_single_user_to_stdout(self, user):
+        """--username restricts the export to that user's cards."""
+        CardFactory(user=user)
+        CardFactory()
+        stdout = io.StringIO()
+        call_command("export_cards", "--format", "csv", "--username", user.username, stdout=stdout)
+        assert len(stdout.getvalue().splitlines()) == 2
+
+    def test_exports_archived_cards(self, user):
+        """Archived cards stay in exports, for the user and globally."""
+        live = CardFactory(user=user)
+        archived = CardFactory(user=user, status="canceled")
+        Card.objects.filter(pk=archived.pk).update(updated_at=timezone.now() - timezone.timedelta(days=365))
+        list(CardArchiver(older_than=timezone.timedelta(days=30)).batches())
+        assert ArchivedCard.objects.filter(pk=archived.pk).exists()
+
+        for args in (["--username", user.username], []):
+            stdout = io.StringIO()
+            call_command("export_cards", *args, stdout=stdout)
+            ids = {json.loads(line)["id"] for line in stdout.getvalue().splitlines()}
+            assert ids == {live.pk, archived.pk}
@@ -0,0 +1,83 @@
+import pytest
+from cards.exceptions import CardNotFoundError, CardUpdateConflictError, InvalidInputError, InvalidStatusTransitionError
+from cards.lifecycle import ALLOWED_TRANSITIONS, CardLifecycle, normalize_status
+from cards.models import Card, CardChoices
+from tests.factories import CardFactory
+
+Status = CardChoices.Status
+
+
+class TestTransitionTable:
+    def test_every_status_has_an_entry(self):
+        """The table covers every status, so no lookup can fail."""
+        assert set(ALLOWED_TRANSITIONS) == set(Status)
+
+    @pytest.mark.parametrize("value, expected", [
+        ("ORDERED", Status.ORDERED),
+        ("sent", Status.SENT),
+        ("CANCELLED", Status.CANCELED),
+    ])
+    def test_normalize_status(self, value, expected):
+        """Provider spellings map onto our choices."""
+        assert normalize_status(value) == expected
+
+    def test_normalize_unknown_status(self):
+        """Unknown statuses are rejected."""
+        with pytest.raises(InvalidInputError):
+            normalize_status("lost")
+
+
+@pytest.mark.django_db
+class TestCardLifecycle:
+    def test_allowed_transition_bumps_version(self, user):
+        """An allowed transition updates the status and increments the version."""
+        card = CardFactory(user=user, status="ORDERED")
+        result = CardLifecycle.transition(card.pk, "SENT")
+        card.refresh_from_db()
+        assert (card.status, card.version) == (Status.SENT, 1)
+        assert (result.from_status, result.to_status, result.version) == (Status.ORDERED, Status.SENT, 1)
+
+    def test_forbidden_transition(self, user):
+        """Terminal statuses cannot be left."""
+        card = CardFactory(user=user, status="canceled")
+        with pytest.raises(InvalidStatusTransitionError):
+            CardLifecycle.transition(card.pk, "activated")
+        card.refresh_from_db()
+        assert card.version == 0
+
+    def test_repeated_status_is_a_no_op(self, user):
+        """Duplicate events leave the row untouched."""
+        card = CardFactory(user=user, status="sent")
+        assert CardLifecycle.transition(card.pk, "sent").version == 0
+
+    def test_missing_card(self):
+        """Transitions on a missing card raise CardNotFoundError."""
+        with pytest.raises(CardNotFoundError):
+            CardLifecycle.transition(99999, "sent")
+
+    def test_conflicting_writer_is_retried(self, mocker, user):
+        """If another writer wins the race, the transition re-reads and is re-validated."""
+        card = CardFactory(user=user, status="sent")
+        read_state = CardLifecycle._current_state
+        reads = []
+
+        def read_then_race(card_id):
+            state = read_state(card_id)
+            reads.append(state)
+            if len(reads) == 1:
+                # Another writer activates the card between our read and our update.
+                Card.objects.filter(pk=card_id).update(status=Status.ACTIVATED, version=5)
+            return state
+
+        mocker.patch.object(CardLifecycle, "_current_state", side_effect=read_then_race)
+        result = CardLifecycle.transition(card.pk, "canceled")
+        card.refresh_from_db()
+        assert result.from_status == Status.ACTIVATED
+        assert (card.status, card.version) == (Status.CANCELED, 6)
+
+    def test_gives_up_under_constant_contention(self, mocker, user):
+        """Persistent conflicts surface as CardUpdateConflictError."""
+        card = CardFactory(user=user, status="sent")
+        mocker.patch.object(CardLifecycle, "_current_state", return_value=("sent", 42))
+        with pytest.raises(CardUpdateConflictError):
+            CardLifecycle.transition(card.pk, "activated")
@@ -6,6 +6,7 @@ from users.models import CustomUser
 from django.db import IntegrityError
 from django.utils import timezone
 from cards.exceptions import UserNotRegisteredError, ProviderFailureError, InvalidCardDataError, InvalidInputError, CardNotFoundError
+from tests.factories import CardFactory
 
 @pytest.mark.django_db
 class TestCardService:
@@ -41,6 +42,20 @@ class TestCardService:
         with pytest.raises(ProviderFailureError):
             CardService.create_card(user, "black")
 
+    def test_create_card_retries_transient_provider_error(self, mocker, user):
+        """A transient 5xx from the provider is retried instead of failing the request."""
+        mocker.patch("providers.retry.time.sleep")
+        mock_response = mocker.Mock()
+        mock_response.status_code = 503
+        mock_provider = mocker.patch("providers.clients.bank_provider.BankProviderClient.create_card")
+        mock_provider.side_effect = [
+            requests.exceptions.HTTPError(response=mock_response),
+            {"expiration_date": "2099-01-01T12:00:00+00:00", "id": "prov_id", "status": "ORDERED"},
+        ]
+        card = CardService.create_card(user, "black")
+        assert card.external_id == "prov_id"
+        assert mock_provider.call_count == 2
+
     def test_create_card_invalid_user_id(self, mocker, user):
         """Raises UserNotRegisteredError if the provider call fails with a 400-level error."""
         # Simulate a 400 error from the provider
@@ -52,6 +67,36 @@ class TestCardService:
         with pytest.raises(UserNotRegisteredError):
             CardService.create_card(user, "black")
 
+    def test_create_card_unregistered_user_is_cached(self, mocker, user):
+        """A user the provider rejected is answered locally on the next attempt."""
+        mock_response = mocker.Mock()
+        mock_response.status_code = 400
+        mock_provider = mocker.patch(
+            "providers.clients.bank_provider.BankProviderClient.create_card",
+            side_effect=requests.exceptions.HTTPError(response=mock_response),
+        )
+        for _ in range(3):
+            with pytest.raises(UserNotRegisteredError):
+                CardService.create_card(user, "black")
+        assert mock_provider.call_count == 1
+
+    def test_create_card_external_id_change_clears_cache(self, mocker, user):
+        """Changing the user's external_id lets the next attempt reach the provider again."""
+        mock_response = mocker.Mock()
+        mock_response.status_code = 400
+        mock_provider = mocker.patch(
+            "providers.clients.bank_provider.BankProviderClient.create_card",
+            side_effect=requests.exceptions.HTTPError(response=mock_response),
+        )
+        with pytest.raises(UserNotRegisteredError):
+            CardService.create_card(user, "black")
+
+        mock_provider.side_effect = None
+        mock_provider.return_value = {"id": "prov_id", "status": "ORDERED"}
+        user.external_id = "fixed_id"
+        user.save()
+        assert CardService.create_card(user, "black").external_id == "prov_id"
+
     def test_create_card_db_error(self, mocker, user):
         """Raises RuntimeError if DB save fails."""
         # Mock the part that fails: the database save.
@@ -125,4 +170,58 @@ class TestCardService:
     def test_retrieve_user_card_not_found(self, user):
         """Raises CardNotFoundError if card does not exist for user."""
         with pytest.raises(CardNotFoundError):
-            CardService.retrieve_user_card(user, 99999)
\ No newline at end of file
+            CardService.retrieve_user_card(user, 99999)
+
+    def test_sparse_fields_defer_other_columns(self, user, card):
+        """Only the requested columns are loaded when `fields` is given."""
+        found = CardService.retrieve_user_card(user, card.pk, fields=["id", "status"])
+        assert found.get_deferred_fields() >= {"color", "expiration_date", "external_id"}
+        listed = CardService.list_user_cards(user, fields=["status"]).get()
+        assert "color" in listed.get_deferred_fields()
+
+
+@pytest.mark.django_db
+class TestCardListFilters:
+    def test_filter_by_status_matches_provider_spelling(self, user):
+        """Status filters match both our lower-case choices and the provider's upper-case values."""
+        ordered = CardFactory(user=user, status="ORDERED")
+        sent = CardFactory(user=user, status="sent")
+        CardFactory(user=user, status="canceled")
+        cards = list(CardService.list_user_cards(user, {"status": {"ordered", "sent"}}))
+        assert set(cards) == {ordered, sent}
+
+    def test_filter_by_status_matches_provider_alias(self, user):
+        """Filtering on "canceled" also finds cards the provider reported as "CANCELLED"."""
+        ours = CardFactory(user=user, status="canceled")
+        providers = CardFactory(user=user, status="CANCELLED")
+        CardFactory(user=user, status="sent")
+        cards = list(CardService.list_user_cards(user, {"status": {"canceled"}}))
+        assert set(cards) == {ours, providers}
+
+    def test_filter_by_color(self, user):
+        """Only cards of the requested color are returned."""
+        pink = CardFactory(user=user, color="pink")
+        CardFactory(user=user, color="black")
+        assert list(CardService.list_user_cards(user, {"color": "pink"})) == [pink]
+
+    def test_filter_by_expiration_range(self, user):
+        """Expiration ranges are inclusive and skip cards without an expiration date."""
+        now = timezone.now()
+        inside = CardFactory(user=user, expiration_date=now + timezone.timedelta(days=30))
+        CardFactory(user=user, expiration_date=now + timezone.timedelta(days=400))
+        CardFactory(user=user, expiration_date=None)
+        filters = {"expiration_date_after": now, "expiration_date_before": now + timezone.timedelta(days=60)}
+        assert list(CardService.list_user_cards(user, filters)) == [inside]
+
+    def test_filter_by_created_range(self, user):
+        """Cards created outside the range are excluded."""
+        recent = CardFactory(user=user)
+        old = CardFactory(user=user)
+        Card.objects.filter(pk=old.pk).update(created_at=timezone.now() - timezone.timedelta(days=10))
+        filters = {"created_at_after": timezone.now() - timezone.timedelta(days=1)}
+        assert list(CardService.list_user_cards(user, filters)) == [recent]
+
+    def test_filters_are_scoped_to_user(self, user):
+        """Filtering never leaks cards belonging to other users."""
+        CardFactory(color="pink")
+        assert list(CardService.list_user_cards(user, {"color": "pink"})) == []
@@ -1,7 +1,8 @@
+import json
 import pytest
 import requests
 from cards.models import Card
-from tests.factories import UserFactory
+from tests.factories import UserFactory, CardFactory
 from django.utils import timezone
 from cards.exceptions import ProviderFailureError
 
@@ -140,4 +141,99 @@ class TestCardAPI:
     def test_list_unauthenticated(self, api_client):
         """Tests that an unauthenticated user cannot list cards and receives a 401 Unauthorized response."""
         response = api_client.get(self.endpoint)
-        assert response.status_code == 401
\ No newline at end of file
+        assert response.status_code == 401
+
+    def test_list_cards_filtered(self, auth_client, user):
+        """Tests that query parameters filter the listed cards on the server."""
+        pink = CardFactory(user=user, color="pink", status="sent")
+        CardFactory(user=user, color="black", status="sent")
+        CardFactory(user=user, color="pink", status="canceled")
+        response = auth_client.get(self.endpoint, {"color": "pink", "status": "sent"})
+        assert response.status_code == 200
+        assert [c["id"] for c in response.data] == [pink.id]
+
+    def test_list_cards_invalid_filter(self, auth_client):
+        """Tests that an unknown filter value returns a 400 Bad Request response."""
+        response = auth_client.get(self.endpoint, {"color": "blue"})
+        assert response.status_code == 400
+        assert "color" in response.data
+
+    def test_list_cards_inverted_range(self, auth_client):
+        """Tests that a range whose lower bound is after its upper bound is rejected."""
+        response = auth_client.get(self.endpoint, {
+            "created_at_after": "2030-01-01T00:00:00Z",
+            "created_at_before": "2020-01-01T00:00:00Z",
+        })
+        assert response.status_code == 400
+
+    def test_list_cards_sparse_fields(self, auth_client, card):
+        """Tests that `fields=` trims the listed cards to the requested fields."""
+        response = auth_client.get(self.endpoint, {"fields": "id,status"})
+        assert response.status_code == 200
+        assert response.data == [{"id": card.id, "status": card.status}]
+
+    def test_retrieve_card_sparse_fields(self, auth_client, card):
+        """Tests that `fields=` trims a retrieved card to the requested fields."""
+        response = auth_client.get(f"{self.endpoint}{card.id}/", {"fields": "status"})
+        assert response.status_code == 200
+        assert response.data == {"status": card.status}
+
+    def test_sparse_fields_unknown_field(self, auth_client, card):
+        """Tests that requesting a field the serializer does not expose returns a 400 Bad Request."""
+        response = auth_client.get(f"{self.endpoint}{card.id}/", {"fields": "id,user"})
+        assert response.status_code == 400
+        assert "fields" in response.data
+
+    def test_export_cards_ndjson(self, auth_client, user, card, read_stream):
+        """Tests that the export endpoint streams the user's cards as NDJSON."""
+        CardFactory()
+        response = auth_client.get(f"{self.endpoint}export/")
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/x-ndjson"
+        lines = read_stream(response).decode().splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [card.id]
+
+    def test_export_cards_csv(self, auth_client, card, read_stream):
+        """Tests that the export endpoint streams CSV with a header row."""
+        response = auth_client.get(f"{self.endpoint}export/", {"export_format": "csv"})
+        assert response.status_code == 200
+        lines = read_stream(response).decode().splitlines()
+        assert lines[0].startswith("id,user_id")
+        assert len(lines) == 2
+
+    def test_export_all_cards_requires_staff(self, auth_client, card):
+        """Tests that non-staff users cannot export every user's cards."""
+        response = auth_client.get(f"{self.endpoint}export/", {"scope": "all"})
+        assert response.status_code == 403
+
+    def test_export_all_cards_as_staff(self, api_client, card, read_stream):
+        """Tests that staff users can export cards across all users."""
+        CardFactory()
+        api_client.force_authenticate(user=UserFactory(is_staff=True))
+        response = api_client.get(f"{self.endpoint}export/", {"scope": "all"})
+        assert response.status_code == 200
+        assert len(read_stream(response).decode().splitlines()) == 2
+
+    def test_batch_get_cards(self, auth_client, user):
+        """Tests that batch-get returns found cards and not-found markers in the requested order."""
+        first, second = CardFactory(user=user), CardFactory(user=user)
+        other = CardFactory()
+        ids = f"{second.id},9999,{first.id},{other.id}"
+        response = auth_client.get(f"{self.endpoint}batch-get/", {"ids": ids})
+        assert response.status_code == 200
+        assert [item["id"] for item in response.data] == [second.id, 9999, first.id, other.id]
+        assert response.data[0]["status"] == second.status
+        assert response.data[1] == {"id": 9999, "error": "card_not_found", "message": "The requested card was not found."}
+        assert response.data[3]["error"] == "card_not_found"
+
+    def test_batch_get_cards_sparse_fields(self, auth_client, card):
+        """Tests that batch-get honours `fields=`."""
+        response = auth_client.get(f"{self.endpoint}batch-get/", {"ids": str(card.id), "fields": "id,status"})
+        assert response.data == [{"id": card.id, "status": card.status}]
+
+    @pytest.mark.parametrize("ids", ["", "1,a", ",".join(str(i) for i in range(101))])
+    def test_batch_get_cards_invalid_ids(self, auth_client, ids):
+        """Tests that missing, malformed or too many IDs return a 400 Bad Request."""
+        response = auth_client.get(f"{self.endpoint}batch-get/", {"ids": ids})
+        assert response.status_code == 400
+        assert "ids" in response.data
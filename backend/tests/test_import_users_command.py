@@ -0,0 +1,54 @@
+import io
+import json
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from users.models import CustomUser
+from tests.factories import UserFactory
+
+
+def run_import(path, *args):
+    stdout = io.StringIO()
+    call_command("import_users", str(path), *args, stdout=stdout)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestImportUsersCommand:
+    def test_import_csv_creates_users(self, tmp_path):
+        """New usernames are created with their external_id and an unusable password."""
+        path = tmp_path / "users.csv"
+        path.write_text("username,external_id,email\nalice,ext_a,alice@example.com\nbob,ext_b,\n")
+        output = run_import(path)
+        alice = CustomUser.objects.get(username="alice")
+        assert alice.external_id == "ext_a"
+        assert alice.email == "alice@example.com"
+        assert not alice.has_usable_password()
+        assert CustomUser.objects.get(username="bob").external_id == "ext_b"
+        assert "2 users created" in output
+
+    def test_import_ndjson_updates_existing_users(self, tmp_path):
+        """Existing usernames get their external_id updated in place."""
+        existing = UserFactory(username="carol", external_id="old")
+        path = tmp_path / "users.ndjson"
+        path.write_text(json.dumps({"username": "carol", "external_id": "new"}) + "\n")
+        output = run_import(path)
+        existing.refresh_from_db()
+        assert existing.external_id == "new"
+        assert "1 updated" in output
+
+    def test_import_in_batches_with_duplicates(self, tmp_path):
+        """Rows are processed in batches and the last occurrence of a username wins."""
+        path = tmp_path / "users.csv"
+        rows = [f"user_{i},ext_{i}" for i in range(5)] + ["user_0,ext_final", ",missing_username"]
+        path.write_text("username,external_id\n" + "\n".join(rows) + "\n")
+        output = run_import(path, "--batch-size", "2")
+        assert CustomUser.objects.filter(username__startswith="user_").count() == 5
+        assert CustomUser.objects.get(username="user_0").external_id == "ext_final"
+        assert output.count("Processed") == 4
+        assert "1 skipped" in output
+
+    def test_missing_file(self, tmp_path):
+        """A missing input file is reported as a command error."""
+        with pytest.raises(CommandError):
+            run_import(tmp_path / "missing.csv")
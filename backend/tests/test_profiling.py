@@ -0,0 +1,151 @@
+import os
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend.profiling import SamplingProfiler, make_profiling_token, profiling_token_user_id
+from tests.factories import UserFactory
+
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture
+def profile_dir(settings, tmp_path):
+    settings.PROFILE_DIR = str(tmp_path)
+    settings.PROFILING_INTERVAL = 0.001
+    return tmp_path
+
+
+@pytest.fixture
+def staff_user():
+    user = UserFactory(is_staff=True)
+    # The factory skips saving after set_password; persist it so the session auth hash matches.
+    user.save()
+    return user
+
+
+class TestSamplingProfiler:
+    def test_collects_stacks_of_the_profiled_thread(self):
+        """Samples show the function that was running, under its caller, with a count per stack."""
+        with SamplingProfiler(interval=0.001) as profiler:
+            busy_wait(0.05)
+        assert profiler.samples > 0
+        stack, count = profiler.collapsed().splitlines()[0].rsplit(" ", 1)
+        assert stack.endswith("test_collects_stacks_of_the_profiled_thread;tests.test_profiling:busy_wait")
+        assert int(count) > 0
+
+
+def jwt_headers(user):
+    return {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(user).access_token}"}
+
+
+@pytest.mark.django_db
+class TestProfilingToken:
+    def test_token_identifies_user(self, staff_user):
+        """A minted token resolves back to the id of the user it was issued to."""
+        assert profiling_token_user_id(make_profiling_token(staff_user)) == staff_user.pk
+
+    def test_tampered_or_expired_token_is_rejected(self, staff_user, settings):
+        """Bad signatures and tokens older than PROFILING_TOKEN_MAX_AGE are rejected."""
+        token = make_profiling_token(staff_user)
+        assert profiling_token_user_id(token + "x") is None
+        settings.PROFILING_TOKEN_MAX_AGE = -1
+        assert profiling_token_user_id(token) is None
+
+    def test_command_prints_token(self, staff_user, capsys):
+        """The profiling_token command prints a valid token for a staff user."""
+        call_command("profiling_token", staff_user.username)
+        assert profiling_token_user_id(capsys.readouterr().out.strip()) == staff_user.pk
+
+    def test_command_rejects_non_staff(self, user):
+        """The command refuses to mint tokens for users who are not staff."""
+        with pytest.raises(CommandError):
+            call_command("profiling_token", user.username)
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+    def test_unsampled_request_is_not_profiled(self, api_client, staff_user, profile_dir):
+        """Without a token and with random sampling off, nothing is profiled."""
+        response = api_client.get("/api/cards/", **jwt_headers(staff_user))
+        assert "X-Profile-Id" not in response
+        assert list(profile_dir.iterdir()) == []
+
+    def test_staff_jwt_client_with_own_token_is_profiled(self, api_client, staff_user, profile_dir):
+        """A staff API client sending its own token gets a profile named after the trace id."""
+        response = api_client.get(
+            "/api/cards/", HTTP_X_PROFILE_TOKEN=make_profiling_token(staff_user), **jwt_headers(staff_user),
+        )
+        assert response.status_code == 200
+        assert (profile_dir / f"{response['X-Profile-Id']}.folded").exists()
+        assert response["X-Profile-Id"] == response["X-Trace-Id"]
+
+    def test_staff_session_with_own_token_is_profiled(self, client, staff_user, profile_dir):
+        """Staff logged in through the admin session can profile their requests too."""
+        client.force_login(staff_user)
+        response = client.get("/admin/", HTTP_X_PROFILE_TOKEN=make_profiling_token(staff_user))
+        assert "X-Profile-Id" in response
+
+    def test_token_of_another_user_is_ignored(self, api_client, user, staff_user, profile_dir):
+        """A staff token is not a bearer credential: another user presenting it is not profiled."""
+        response = api_client.get(
+            "/api/cards/", HTTP_X_PROFILE_TOKEN=make_profiling_token(staff_user), **jwt_headers(user),
+        )
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response
+        assert list(profile_dir.iterdir()) == []
+
+    def test_unauthenticated_token_is_ignored(self, api_client, staff_user, profile_dir):
+        """A token alone, without the staff user's credentials, profiles nothing."""
+        response = api_client.get("/api/cards/", HTTP_X_PROFILE_TOKEN=make_profiling_token(staff_user))
+        assert response.status_code == 401
+        assert "X-Profile-Id" not in response
+
+    def test_staff_status_is_required(self, api_client, user, profile_dir):
+        """Users who are not staff cannot profile, even with a token issued to them."""
+        response = api_client.get("/api/cards/", HTTP_X_PROFILE_TOKEN=make_profiling_token(user), **jwt_headers(user))
+        assert "X-Profile-Id" not in response
+
+    def test_query_parameter_is_not_accepted(self, api_client, staff_user, profile_dir):
+        """Tokens are only read from the header, so they do not end up in access logs."""
+        response = api_client.get("/api/cards/", {"_profile": make_profiling_token(staff_user)}, **jwt_headers(staff_user))
+        assert "X-Profile-Id" not in response
+
+    def test_old_profiles_are_pruned(self, api_client, profile_dir, settings):
+        """Only the newest PROFILING_MAX_FILES profiles are kept."""
+        settings.PROFILING_SAMPLE_RATE = 1.0
+        settings.PROFILING_MAX_FILES = 2
+        now = time.time()
+        for name, age in (("oldest", 120), ("older", 60)):
+            path = profile_dir / f"{name}.folded"
+            path.write_text("")
+            os.utime(path, (now - age, now - age))
+        profile_id = api_client.get("/api/cards/")["X-Profile-Id"]
+        assert {path.stem for path in profile_dir.iterdir()} == {"older", profile_id}
+
+    def test_async_request_is_profiled(self, async_client, staff_user, profile_dir, settings):
+        """Under an async handler a token-authorised request is profiled too."""
+        settings.PROFILING_SAMPLE_RATE = 0
+        headers = {
+            "x-profile-token": make_profiling_token(staff_user),
+            "authorization": jwt_headers(staff_user)["HTTP_AUTHORIZATION"],
+        }
+
+        async def get():
+            return await async_client.get("/api/cards/", headers=headers)
+
+        response = async_to_sync(get)()
+        assert response.status_code == 200
+        assert (profile_dir / f"{response['X-Profile-Id']}.folded").exists()
+
+    def test_random_sampling(self, auth_client, profile_dir, settings):
+        """PROFILING_SAMPLE_RATE profiles requests without any token."""
+        settings.PROFILING_SAMPLE_RATE = 1.0
+        response = auth_client.get("/api/cards/")
+        assert (profile_dir / f"{response['X-Profile-Id']}.folded").exists()
@@ -0,0 +1,147 @@
+import threading
+import pytest
+import requests
+from providers.retry import AttemptStats, RetryBudget, RetryingCaller, RetryPolicy, is_retryable, never_sent
+
+
+def http_error(status_code):
+    return requests.exceptions.HTTPError(response=type('obj', (object,), {'status_code': status_code})())
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(mocker):
+    return mocker.patch("providers.retry.time.sleep")
+
+
+@pytest.fixture
+def caller():
+    return RetryingCaller(budget=RetryBudget(ratio=0.1, min_per_second=1, window=10))
+
+
+class TestRetryPolicy:
+    def test_reads_operation_overrides(self, settings):
+        """Operation settings override the defaults, which override the dataclass defaults."""
+        settings.PROVIDER_RETRY_POLICIES = {"default": {"max_attempts": 5}, "op": {"base_delay": 0.5}}
+        policy = RetryPolicy.for_operation("op")
+        assert policy.max_attempts == 5
+        assert policy.base_delay == 0.5
+        assert RetryPolicy.for_operation("other").base_delay == RetryPolicy().base_delay
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Each delay is drawn from [0, min(max_delay, base * 2^n)]."""
+        policy = RetryPolicy(base_delay=0.1, max_delay=0.3)
+        delays = [policy.backoff(attempt) for attempt in range(1, 6) for _ in range(20)]
+        assert all(0 <= delay <= 0.3 for delay in delays)
+        assert len(set(delays)) > 1
+
+    @pytest.mark.parametrize("exc, expected", [
+        (http_error(500), True),
+        (http_error(503), True),
+        (http_error(400), False),
+        (requests.exceptions.ConnectionError(), True),
+        (requests.exceptions.Timeout(), True),
+        (ValueError(), False),
+    ])
+    def test_is_retryable(self, exc, expected):
+        """Only transient failures are retried."""
+        assert is_retryable(exc) is expected
+
+    def test_refused_connection_was_never_sent(self):
+        """A refused connection (nothing listening) proves the request never reached the provider."""
+        with pytest.raises(requests.exceptions.ConnectionError) as exc_info:
+            requests.post("http://127.0.0.1:9/", timeout=1)
+        assert never_sent(exc_info.value)
+        assert not never_sent(requests.exceptions.ConnectionError("Connection reset by peer"))
+
+    @pytest.mark.parametrize("exc, expected", [
+        (requests.exceptions.ConnectTimeout(), True),
+        (http_error(503), True),
+        (http_error(500), False),
+        (http_error(502), False),
+        (requests.exceptions.ReadTimeout(), False),
+        (requests.exceptions.ConnectionError("Connection reset by peer"), False),
+        (http_error(400), False),
+    ])
+    def test_create_card_only_retries_unprocessed_requests(self, exc, expected):
+        """
+        create_card is not idempotent: only failures proving the provider did not act are retried,
+        since a read timeout or a 500 may come after the card was issued.
+        """
+        assert RetryPolicy.for_operation("create_card").should_retry(exc) is expected
+
+    @pytest.mark.parametrize("exc", [requests.exceptions.ReadTimeout(), http_error(500)])
+    def test_default_policy_retries_ambiguous_failures(self, exc):
+        """Idempotent operations keep retrying every transient failure."""
+        assert RetryPolicy().should_retry(exc)
+
+
+class TestRetryingCaller:
+    def test_retries_transient_errors(self, mocker, caller):
+        """A 5xx followed by a success returns the successful response."""
+        func = mocker.Mock(side_effect=[http_error(502), {"id": "ok"}])
+        assert caller.call("op", func, "a") == {"id": "ok"}
+        assert func.call_count == 2
+
+    def test_create_card_is_not_retried_after_read_timeout(self, mocker, caller):
+        """A create_card read timeout is raised at once rather than risking a duplicate card."""
+        func = mocker.Mock(side_effect=requests.exceptions.ReadTimeout())
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            caller.call("create_card", func)
+        assert func.call_count == 1
+
+    def test_create_card_is_retried_after_connect_timeout(self, mocker, caller):
+        """A create_card connect timeout never reached the provider, so it is retried."""
+        func = mocker.Mock(side_effect=[requests.exceptions.ConnectTimeout(), {"id": "ok"}])
+        assert caller.call("create_card", func) == {"id": "ok"}
+        assert func.call_count == 2
+
+    def test_does_not_retry_client_errors(self, mocker, caller):
+        """A 400 is raised straight away."""
+        func = mocker.Mock(side_effect=http_error(400))
+        with pytest.raises(requests.exceptions.HTTPError):
+            caller.call("op", func)
+        assert func.call_count == 1
+
+    def test_gives_up_after_max_attempts(self, mocker, settings, caller):
+        """The last error is re-raised once the policy's attempts are used up."""
+        settings.PROVIDER_RETRY_POLICIES = {"op": {"max_attempts": 4}}
+        func = mocker.Mock(side_effect=http_error(500))
+        with pytest.raises(requests.exceptions.HTTPError):
+            caller.call("op", func)
+        assert func.call_count == 4
+
+    def test_budget_limits_retries(self, mocker):
+        """Once the budget is spent, failures are no longer retried."""
+        caller = RetryingCaller(budget=RetryBudget(ratio=0, min_per_second=0.2, window=10))
+        func = mocker.Mock(side_effect=http_error(500))
+        for _ in range(3):
+            with pytest.raises(requests.exceptions.HTTPError):
+                caller.call("op", func)
+        # Two retries fit in the reserve (0.2/s over 10s); every other call made a single attempt.
+        assert func.call_count == 3 + 2
+
+    def test_records_attempt_stats(self, mocker, caller):
+        """Every attempt is recorded with its outcome."""
+        func = mocker.Mock(side_effect=[http_error(500), "ok"])
+        caller.call("op", func)
+        assert caller.stats.snapshot("op")["outcomes"] == {"retryable_error": 1, "success": 1}
+
+    def test_hedges_slow_requests(self, settings):
+        """A request still running after the latency threshold is raced against a hedge."""
+        settings.PROVIDER_RETRY_POLICIES = {"op": {"hedge": True, "hedge_min_samples": 1}}
+        stats = AttemptStats()
+        stats.record("op", 1, 0.01, "success")
+        caller = RetryingCaller(budget=RetryBudget(), stats=stats)
+        release = threading.Event()
+        calls = []
+
+        def slow_then_fast():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(5)
+                return "slow"
+            return "fast"
+
+        assert caller.call("op", slow_then_fast) == "fast"
+        release.set()
+        assert len(calls) == 2
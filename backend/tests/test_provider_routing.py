@@ -0,0 +1,85 @@
+import pytest
+import requests
+from cards.services import CardService
+from providers.routing import ProviderEndpoint, ProviderRegistry, ProviderRouter, get_provider_router
+
+EU = ProviderEndpoint("eu", "https://eu.bankprovider.com/", region="eu")
+US = ProviderEndpoint("us", "https://us.bankprovider.com/", region="us")
+
+
+def make_router(*endpoints, **options):
+    return ProviderRouter(ProviderRegistry(endpoints), explore_ratio=0, **options)
+
+
+class TestProviderRegistry:
+    def test_requires_unique_names(self):
+        """Duplicate endpoint names are a configuration error."""
+        with pytest.raises(ValueError):
+            ProviderRegistry([EU, ProviderEndpoint("eu", "https://other/")])
+
+    def test_from_settings(self, settings):
+        """Endpoints are read from BANK_PROVIDER_ENDPOINTS."""
+        settings.BANK_PROVIDER_ENDPOINTS = [{"name": "eu", "base_url": "https://eu/", "weight": 2}]
+        registry = ProviderRegistry.from_settings()
+        assert registry.get("eu").weight == 2
+
+
+class TestProviderRouter:
+    def test_prefers_lowest_latency(self):
+        """Once every endpoint has samples, the fastest one is chosen."""
+        router = make_router(EU, US)
+        router.observe(EU, 0.300, ok=True)
+        router.observe(US, 0.050, ok=True)
+        assert {router.choose() for _ in range(20)} == {US}
+
+    def test_weight_scales_latency(self):
+        """A heavier weight lets a slightly slower endpoint win."""
+        router = make_router(EU, ProviderEndpoint("us", "https://us/", weight=4))
+        router.observe(EU, 0.100, ok=True)
+        router.observe(router.registry.get("us"), 0.200, ok=True)
+        assert router.choose().name == "us"
+
+    def test_avoids_failing_endpoint(self):
+        """An endpoint with a high error rate is skipped while another is healthy."""
+        router = make_router(EU, US)
+        router.observe(EU, 0.010, ok=False)
+        router.observe(US, 0.500, ok=True)
+        assert router.choose() == US
+
+    def test_unexplored_endpoints_are_tried_first(self):
+        """Endpoints without estimates get traffic before the known ones."""
+        router = make_router(EU, US)
+        router.observe(EU, 0.010, ok=True)
+        assert router.choose() == US
+
+    def test_ewma_tracks_recent_latency(self):
+        """Latency estimates move towards recent observations."""
+        router = make_router(EU, US, alpha=0.5)
+        router.observe(EU, 1.0, ok=True)
+        router.observe(EU, 0.0, ok=True)
+        assert router.snapshot()["eu"]["latency"] == pytest.approx(0.5)
+
+    def test_call_records_only_transient_failures(self, mocker):
+        """Client errors do not count against the endpoint's health, server errors do."""
+        router = make_router(EU)
+        client_error = requests.exceptions.HTTPError(response=mocker.Mock(status_code=400))
+        server_error = requests.exceptions.HTTPError(response=mocker.Mock(status_code=500))
+        for exc in (client_error, server_error):
+            with pytest.raises(requests.exceptions.HTTPError):
+                router.call(mocker.Mock(side_effect=exc))
+        assert router.snapshot()["eu"]["error_rate"] == pytest.approx(0.2)
+        assert router.call(lambda endpoint: endpoint.name) == (EU, "eu")
+
+
+@pytest.mark.django_db
+class TestCardIssuanceRouting:
+    def test_card_records_issuing_endpoint(self, settings, mocker, user):
+        """The endpoint that issued the card is stored on it."""
+        settings.BANK_PROVIDER_ENDPOINTS = [{"name": "eu", "base_url": "https://eu/"}]
+        mocker.patch(
+            "providers.clients.bank_provider.BankProviderClient.create_card",
+            return_value={"id": "prov_id", "status": "ORDERED"},
+        )
+        card = CardService.create_card(user, "black")
+        assert card.provider == "eu"
+        assert get_provider_router().snapshot()["eu"]["samples"] == 1
@@ -0,0 +1,121 @@
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend.querycount import QueryRecorder, query_budget, query_shape
+from cards.models import Card
+from tests.factories import CardFactory
+
+DATASET_SIZES = [1, 25]
+
+# (method, path, payload, max queries). "{card}" is replaced with one of the user's cards.
+# Card endpoints authenticate with a real JWT, so the user lookup is part of each budget.
+CARD_ENDPOINT_BUDGETS = [
+    ("get", "/api/cards/", {}, 2),
+    ("get", "/api/cards/", {"status": "ordered", "fields": "id,status"}, 2),
+    ("get", "/api/cards/", {"include_archived": "true"}, 3),
+    ("get", "/api/cards/{card}/", {}, 2),
+    ("get", "/api/cards/{card}/", {"include_archived": "true"}, 2),
+    ("get", "/api/cards/batch-get/", {"ids": "{card},9999"}, 2),
+    ("get", "/api/cards/export/", {}, 5),
+    ("post", "/api/cards/", {"color": "black"}, 4),
+]
+
+
+async def drain(response):
+    """Consume a streaming body, which the export endpoint produces asynchronously."""
+    async for _ in response.streaming_content:
+        pass
+
+
+def run_with_budget(client, method, path, payload, budget, repeat_threshold=3):
+    with query_budget(budget, repeat_threshold=repeat_threshold) as recorder:
+        response = getattr(client, method)(path, payload)
+        if response.streaming:
+            async_to_sync(drain)(response)
+    assert response.status_code < 400, response.content
+    return recorder.count
+
+
+@pytest.mark.django_db
+class TestEndpointQueryBudgets:
+    @pytest.fixture
+    def jwt_client(self, api_client, user):
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return api_client
+
+    @pytest.mark.parametrize("method, path, payload, budget", CARD_ENDPOINT_BUDGETS)
+    def test_card_endpoint_budget_is_independent_of_dataset_size(self, jwt_client, user, method, path, payload, budget):
+        """Each card endpoint stays within its budget, and adding cards does not add queries."""
+        card = CardFactory(user=user)
+        counts = []
+        for size in DATASET_SIZES:
+            CardFactory.create_batch(size - Card.objects.filter(user=user).count(), user=user)
+            params = {key: value.format(card=card.id) for key, value in payload.items()}
+            counts.append(run_with_budget(jwt_client, method, path.format(card=card.id), params, budget))
+        assert len(set(counts)) == 1, counts
+
+    def test_token_obtain_budget(self, api_client, user):
+        """Obtaining a token pair looks the user up and records the outstanding refresh token."""
+        user.set_password("password")
+        user.save()
+        run_with_budget(api_client, "post", "/api/token/", {"username": user.username, "password": "password"}, 2)
+
+    def test_token_refresh_budget(self, api_client, user):
+        """
+        Refreshing with rotation checks and blacklists the old token and records the new one.
+        simplejwt looks the user up three times, so repeats are not checked here; the budget
+        includes the savepoints its get_or_create calls open inside the test transaction.
+        """
+        refresh = str(RefreshToken.for_user(user))
+        run_with_budget(api_client, "post", "/api/token/refresh/", {"refresh": refresh}, 13, repeat_threshold=None)
+
+
+class TestQueryRecorder:
+    def test_query_shape_collapses_in_lists(self):
+        """IN lists of different lengths share a shape."""
+        assert query_shape("SELECT 1 WHERE id IN (%s, %s, %s)") == query_shape("SELECT 1 WHERE id IN (%s)")
+
+    @pytest.mark.django_db
+    def test_detects_repeated_queries(self, user):
+        """Per-row queries show up as a repeated shape."""
+        cards = CardFactory.create_batch(3, user=user)
+        recorder = QueryRecorder()
+        with recorder.install():
+            for card in cards:
+                Card.objects.get(pk=card.pk).user
+        # One repeated shape for the card lookups and one for the per-row user lookups.
+        assert list(recorder.repeated(3).values()) == [3, 3]
+
+    @pytest.mark.django_db
+    def test_records_queries_run_on_other_threads(self, user):
+        """
+        Queries run through sync_to_async from the block are recorded even on another thread's
+        connection, as under ASGI, and nested recorders all see them.
+        """
+        def count_users():
+            try:
+                return type(user).objects.count()
+            finally:
+                connection.close()
+
+        async def count_users_off_thread():
+            return await sync_to_async(count_users, thread_sensitive=False)()
+
+        with QueryRecorder().install() as outer, QueryRecorder().install() as inner:
+            async_to_sync(count_users_off_thread)()
+        assert outer.count == inner.count == 1
+
+    @pytest.mark.django_db
+    def test_query_budget_fails_when_exceeded(self, user):
+        """Going over budget is an assertion failure."""
+        with pytest.raises(AssertionError):
+            with query_budget(0):
+                list(type(user).objects.all())
+
+    @pytest.mark.django_db
+    def test_middleware_reports_query_count(self, settings, auth_client):
+        """With inspection enabled, responses carry the number of queries they ran."""
+        settings.QUERY_INSPECTION_ENABLED = True
+        response = auth_client.get("/api/cards/")
+        assert response["X-Query-Count"] == "1"
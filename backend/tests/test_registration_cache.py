@@ -0,0 +1,65 @@
+import io
+import pytest
+from django.core.management import call_command
+from providers.registration_cache import UnregisteredUserCache
+from users.models import CustomUser
+from tests.factories import UserFactory
+
+
+@pytest.mark.django_db
+class TestUnregisteredUserCacheInvalidation:
+    def test_saving_new_external_id_invalidates_old_and_new(self, user):
+        """Both the previous and the new external_id are forgotten when it changes."""
+        UnregisteredUserCache.add(user.external_id)
+        UnregisteredUserCache.add("new_id")
+        previous = user.external_id
+        user.external_id = "new_id"
+        user.save()
+        assert not UnregisteredUserCache.contains(previous)
+        assert not UnregisteredUserCache.contains("new_id")
+
+    def test_saving_other_fields_keeps_entry(self, user):
+        """Saves that cannot change external_id leave the cache alone."""
+        user = CustomUser.objects.get(pk=user.pk)
+        UnregisteredUserCache.add(user.external_id)
+        user.first_name = "Ada"
+        user.save()
+        user.save(update_fields=["last_name"])
+        assert UnregisteredUserCache.contains(user.external_id)
+
+    def test_update_superuser_command_invalidates(self):
+        """The update_superuser command goes through save() and clears the entry."""
+        UserFactory(username="admin", is_superuser=True, external_id="bad_id")
+        UnregisteredUserCache.add("good_id")
+        call_command("update_superuser", "--external-id", "good_id", stdout=io.StringIO())
+        assert not UnregisteredUserCache.contains("good_id")
+
+    def test_import_users_invalidates(self, tmp_path):
+        """Bulk provisioning clears entries for replaced and newly assigned external_ids."""
+        UserFactory(username="dave", external_id="old_id")
+        UnregisteredUserCache.add("old_id")
+        UnregisteredUserCache.add("new_id")
+        UnregisteredUserCache.add("eve_id")
+        path = tmp_path / "users.csv"
+        path.write_text("username,external_id\ndave,new_id\neve,eve_id\n")
+        stderr = io.StringIO()
+        call_command("import_users", str(path), stdout=io.StringIO(), stderr=stderr)
+        assert not any(UnregisteredUserCache.contains(ext) for ext in ("old_id", "new_id", "eve_id"))
+        assert "local to this process" in stderr.getvalue()
+
+    def test_update_superuser_warns_when_cache_is_not_shared(self):
+        """With the per-process in-memory cache, the command warns that web workers wait for the TTL."""
+        UserFactory(username="admin", is_superuser=True, external_id="bad_id")
+        stderr = io.StringIO()
+        call_command("update_superuser", "--external-id", "good_id", stdout=io.StringIO(), stderr=stderr)
+        assert "local to this process" in stderr.getvalue()
+
+    def test_update_superuser_does_not_warn_with_shared_cache(self, settings, tmp_path):
+        """No warning when the cache is shared between processes."""
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": str(tmp_path)},
+        }
+        UserFactory(username="admin", is_superuser=True, external_id="bad_id")
+        stderr = io.StringIO()
+        call_command("update_superuser", "--external-id", "good_id", stdout=io.StringIO(), stderr=stderr)
+        assert stderr.getvalue() == ""
@@ -0,0 +1,128 @@
+import pytest
+import requests
+from tests.factories import UserFactory
+from cards.throttling import SlidingWindowCounter, parse_rate
+
+
+@pytest.fixture
+def low_rates(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {'card_issuance_user': '2/min', 'card_issuance_provider': '3/min'},
+    }
+
+
+class TestSlidingWindowCounter:
+    def test_allows_up_to_limit(self):
+        """Requests within the limit are allowed and the next one is rejected with a wait."""
+        counter = SlidingWindowCounter()
+        assert counter.hit("t:a", 2, 60, 1000.0) == (True, 0)
+        assert counter.hit("t:a", 2, 60, 1001.0) == (True, 0)
+        allowed, wait = counter.hit("t:a", 2, 60, 1002.0)
+        assert not allowed
+        assert 0 < wait <= 120
+
+    def test_previous_window_is_weighted(self):
+        """Requests from the previous window still count for the part of it that overlaps."""
+        counter = SlidingWindowCounter()
+        for second in range(1200, 1204):
+            counter.hit("t:b", 4, 60, float(second))
+        # 1/4 into the next window, 3/4 of the previous 4 requests still count.
+        assert counter.hit("t:b", 4, 60, 1275.0)[0]
+        assert not counter.hit("t:b", 4, 60, 1276.0)[0]
+
+    def test_falls_back_to_local_counters(self, mocker):
+        """A failing cache backend degrades to per-process counting."""
+        counter = SlidingWindowCounter()
+        mocker.patch.object(counter.cache, "incr", side_effect=ConnectionError)
+        mocker.patch.object(counter.cache, "get", side_effect=ConnectionError)
+        assert counter.hit("t:c", 1, 60, 3000.0)[0]
+        assert not counter.hit("t:c", 1, 60, 3001.0)[0]
+
+    def test_parse_rate(self):
+        """Rates use DRF's '<requests>/<period>' notation."""
+        assert parse_rate("10/min") == (10, 60)
+        assert parse_rate("600/hour") == (600, 3600)
+
+
+@pytest.mark.django_db
+class TestCardIssuanceThrottle:
+    endpoint = "/api/cards/"
+
+    def test_per_user_limit(self, low_rates, auth_client):
+        """A user exceeding their rate gets a 429 with a Retry-After header."""
+        for _ in range(2):
+            assert auth_client.post(self.endpoint, {"color": "black"}).status_code == 201
+        response = auth_client.post(self.endpoint, {"color": "black"})
+        assert response.status_code == 429
+        assert response.data["error"] == "rate_limited"
+        assert int(response["Retry-After"]) > 0
+
+    def test_global_provider_limit(self, low_rates, api_client):
+        """The provider bucket is shared by all users."""
+        statuses = []
+        for _ in range(4):
+            api_client.force_authenticate(user=UserFactory())
+            statuses.append(api_client.post(self.endpoint, {"color": "black"}).status_code)
+        assert statuses == [201, 201, 201, 429]
+
+    def test_rejected_requests_do_not_consume_global_quota(self, low_rates, auth_client, api_client):
+        """Requests rejected by the per-user bucket never take from the provider bucket."""
+        for _ in range(5):
+            auth_client.post(self.endpoint, {"color": "black"})
+        api_client.force_authenticate(user=UserFactory())
+        assert api_client.post(self.endpoint, {"color": "black"}).status_code == 201
+
+    def test_provider_limit_sets_retry_after(self, low_rates, api_client):
+        """Exhausting the provider quota answers 429 with a Retry-After header."""
+        for _ in range(3):
+            api_client.force_authenticate(user=UserFactory())
+            api_client.post(self.endpoint, {"color": "black"})
+        api_client.force_authenticate(user=UserFactory())
+        response = api_client.post(self.endpoint, {"color": "black"})
+        assert response.status_code == 429
+        assert response.data["error"] == "rate_limited"
+        assert int(response["Retry-After"]) > 0
+
+    def test_invalid_bodies_do_not_consume_provider_quota(self, low_rates, auth_client, api_client, mocker):
+        """Requests rejected by validation never reach the provider, so they leave its quota to others."""
+        provider = mocker.patch("providers.clients.bank_provider.BankProviderClient.create_card")
+        provider.return_value = {"id": "prov_id", "status": "ORDERED"}
+        for _ in range(2):
+            assert auth_client.post(self.endpoint, {"color": "blue"}).status_code == 400
+        statuses = []
+        for _ in range(3):
+            api_client.force_authenticate(user=UserFactory())
+            statuses.append(api_client.post(self.endpoint, {"color": "black"}).status_code)
+        assert statuses == [201, 201, 201]
+        assert provider.call_count == 3
+
+    def test_cached_unregistered_answers_do_not_consume_provider_quota(self, settings, auth_client, user, api_client, mocker):
+        """A client looping on a cached "not registered" answer only charged the provider quota once."""
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'card_issuance_user': '10/min', 'card_issuance_provider': '3/min'},
+        }
+        rejected = mocker.Mock(status_code=400)
+
+        def create_card(client, external_id, color):
+            if external_id == user.external_id:
+                raise requests.exceptions.HTTPError(response=rejected)
+            return {"id": f"card_{external_id}", "status": "ORDERED"}
+
+        provider = mocker.patch(
+            "providers.clients.bank_provider.BankProviderClient.create_card", autospec=True, side_effect=create_card,
+        )
+        for _ in range(5):
+            assert auth_client.post(self.endpoint, {"color": "black"}).status_code == 400
+        statuses = []
+        for _ in range(2):
+            api_client.force_authenticate(user=UserFactory())
+            statuses.append(api_client.post(self.endpoint, {"color": "black"}).status_code)
+        assert statuses == [201, 201]
+        assert provider.call_count == 3
+
+    def test_reads_are_not_throttled(self, low_rates, auth_client):
+        """Only card issuance is rate limited."""
+        for _ in range(4):
+            assert auth_client.get(self.endpoint).status_code == 200
@@ -0,0 +1,208 @@
+import json
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.http import HttpResponse
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend.tracing import (
+    BatchSpanProcessor, FileSpanExporter, InMemorySpanExporter, Tracer, TracingMiddleware, get_tracer,
+    parse_traceparent,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def exporter(mocker):
+    """Route every span to memory for the duration of a test."""
+    exporter = InMemorySpanExporter()
+    processor = BatchSpanProcessor(exporter, schedule_delay=60)
+    mocker.patch("backend.tracing._tracer", Tracer(processor))
+    yield exporter
+    processor.shutdown()
+
+
+def finished_spans(exporter):
+    get_tracer().processor.force_flush()
+    return {span.name: span for span in exporter.spans}
+
+
+class TestTraceparent:
+    def test_parses_valid_header(self):
+        """Trace id, parent span id and the sampled flag are read from a traceparent header."""
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+
+    @pytest.mark.parametrize("header", [
+        "", "garbage", f"01-{TRACE_ID}-{PARENT_ID}-01", f"00-{'0' * 32}-{PARENT_ID}-01", f"00-{TRACE_ID}-{'0' * 16}-01",
+    ])
+    def test_rejects_invalid_header(self, header):
+        """Malformed headers, unknown versions and all-zero ids start a new trace instead."""
+        assert parse_traceparent(header) is None
+
+
+class TestTracer:
+    def test_nested_spans_share_trace(self):
+        """Child spans inherit the trace id and point at the enclosing span."""
+        exporter = InMemorySpanExporter()
+        processor = BatchSpanProcessor(exporter, schedule_delay=60)
+        tracer = Tracer(processor)
+        with tracer.start_span("outer") as outer:
+            with tracer.start_span("inner") as inner:
+                pass
+        processor.shutdown()
+        assert inner.trace_id == outer.trace_id
+        assert inner.parent_id == outer.span_id
+        assert outer.parent_id is None
+        assert [span.name for span in exporter.spans] == ["inner", "outer"]
+
+    def test_error_is_recorded(self):
+        """An exception leaving a span marks the span as failed and propagates."""
+        tracer = Tracer()
+        with pytest.raises(ValueError):
+            with tracer.start_span("failing") as span:
+                raise ValueError("boom")
+        assert span.error == "ValueError: boom"
+
+    def test_without_processor_nothing_is_recorded(self):
+        """A tracer with no exporter still issues trace ids but does not sample."""
+        with Tracer().start_span("request") as span:
+            assert len(span.trace_id) == 32
+        assert not span.sampled
+
+
+class TestBatchSpanProcessor:
+    def test_exports_in_batches(self):
+        """Queued spans are exported in batches of at most max_batch_size."""
+        batches = []
+        exporter = InMemorySpanExporter()
+        exporter.export = lambda spans: batches.append(len(spans))
+        processor = BatchSpanProcessor(exporter, max_batch_size=4, schedule_delay=60)
+        tracer = Tracer(processor)
+        for i in range(10):
+            with tracer.start_span(f"span-{i}"):
+                pass
+        processor.shutdown()
+        assert sum(batches) == 10
+        assert max(batches) <= 4
+
+    def test_drops_spans_when_queue_is_full(self):
+        """Spans beyond max_queue_size are dropped and counted instead of blocking the caller."""
+        exporter = InMemorySpanExporter()
+        processor = BatchSpanProcessor(exporter, max_queue_size=3, max_batch_size=10, schedule_delay=60)
+        tracer = Tracer(processor)
+        for i in range(5):
+            with tracer.start_span(f"span-{i}"):
+                pass
+        processor.shutdown()
+        assert len(exporter.spans) == 3
+        assert processor.dropped == 2
+
+    def test_export_errors_do_not_propagate(self, mocker):
+        """A failing exporter is logged and the batch discarded."""
+        exporter = mocker.Mock()
+        exporter.export.side_effect = ConnectionError
+        processor = BatchSpanProcessor(exporter, schedule_delay=60)
+        with Tracer(processor).start_span("span"):
+            pass
+        processor.force_flush()
+        processor.shutdown()
+        exporter.export.assert_called_once()
+
+    def test_file_exporter_writes_json_lines(self, tmp_path):
+        """The file exporter appends one JSON object per span for offline inspection."""
+        path = tmp_path / "traces.jsonl"
+        processor = BatchSpanProcessor(FileSpanExporter(str(path)), schedule_delay=60)
+        with Tracer(processor).start_span("span", attributes={"key": "value"}):
+            pass
+        processor.shutdown()
+        [line] = path.read_text().splitlines()
+        assert json.loads(line)["attributes"] == {"key": "value"}
+
+
+@pytest.mark.django_db
+class TestRequestTracing:
+    def test_create_card_spans(self, auth_client, exporter):
+        """Issuing a card records the request, view, service, provider call and SQL spans in one trace."""
+        response = auth_client.post("/api/cards/", {"color": "black"})
+        assert response.status_code == 201
+        spans = finished_spans(exporter)
+        root = spans["POST /api/cards/"]
+        view = spans["CardViewSet.create"]
+        service = spans["CardService.create_card"]
+        provider = spans["POST /api/v2/card/"]
+        assert view.parent_id == root.span_id
+        assert service.parent_id == view.span_id
+        assert provider.attributes["http.response.status_code"] == 201
+        assert spans["db.query"].attributes["db.statement"]
+        assert {span.trace_id for span in exporter.spans} == {response["X-Trace-Id"]}
+        assert root.attributes["http.response.status_code"] == 201
+
+    def test_list_and_retrieve_service_spans(self, auth_client, card, exporter):
+        """Listing and retrieving cards run inside their service spans."""
+        auth_client.get("/api/cards/")
+        auth_client.get(f"/api/cards/{card.id}/")
+        spans = finished_spans(exporter)
+        assert {"CardService.list_user_cards", "CardService.retrieve_user_card"} <= spans.keys()
+
+    def test_incoming_traceparent_is_continued(self, auth_client, exporter):
+        """A W3C traceparent header makes the request's root span a child of the caller's span."""
+        response = auth_client.get("/api/cards/", HTTP_TRACEPARENT=f"00-{TRACE_ID}-{PARENT_ID}-01")
+        root = finished_spans(exporter)["GET /api/cards/"]
+        assert response["X-Trace-Id"] == TRACE_ID
+        assert root.trace_id == TRACE_ID
+        assert root.parent_id == PARENT_ID
+
+    def test_unsampled_traceparent_is_not_recorded(self, auth_client, exporter):
+        """The caller's decision not to sample is honored, while the trace id is still propagated."""
+        response = auth_client.get("/api/cards/", HTTP_TRACEPARENT=f"00-{TRACE_ID}-{PARENT_ID}-00")
+        assert response["X-Trace-Id"] == TRACE_ID
+        assert finished_spans(exporter) == {}
+
+    def test_error_body_trace_id_matches_trace(self, auth_client, exporter):
+        """The trace_id in an error body is the id of the request's trace."""
+        response = auth_client.get("/api/cards/999999/")
+        assert response.status_code == 404
+        assert response.data["trace_id"] == response["X-Trace-Id"]
+        view = finished_spans(exporter)["CardViewSet.retrieve"]
+        assert view.trace_id == response.data["trace_id"]
+
+    def test_streamed_body_sql_is_traced(self, auth_client, card, exporter, read_stream):
+        """The root span of a streaming response stays open, and active, while the body runs its SQL."""
+        response = auth_client.get("/api/cards/export/")
+        read_stream(response)
+        response.close()
+        root = finished_spans(exporter)["GET /api/cards/export/"]
+        card_queries = [
+            span for span in exporter.spans if span.name == "db.query" and "cards_card" in span.attributes["db.statement"]
+        ]
+        assert card_queries
+        assert {span.parent_id for span in card_queries} == {root.span_id}
+        assert root.end_time >= max(span.end_time for span in card_queries)
+
+    def test_async_request(self, async_client, user, card, exporter):
+        """Under an async handler the middleware runs natively and still traces the streamed body."""
+        headers = {"authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+
+        async def export():
+            response = await async_client.get("/api/cards/export/", headers=headers)
+            return response, b"".join([chunk async for chunk in response.streaming_content])
+
+        response, body = async_to_sync(export)()
+        assert card.external_id in body.decode()
+        spans = finished_spans(exporter)
+        root = spans["GET /api/cards/export/"]
+        assert root.trace_id == response["X-Trace-Id"]
+        assert spans["db.query"].trace_id == root.trace_id
+
+
+class TestTracingMiddleware:
+    def test_adapts_to_async_handler(self, rf, exporter):
+        """Given an async get_response the middleware is itself a coroutine function, so Django adds no thread hop."""
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = TracingMiddleware(get_response)
+        assert iscoroutinefunction(middleware)
+        response = async_to_sync(middleware)(rf.get("/"))
+        assert finished_spans(exporter)["GET /"].trace_id == response["X-Trace-Id"]
@@ -1,3 +1,17 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from backend.admin import LargeTableAdminMixin
+from .models import CustomUser
 
-# Register your models here.
+
+@admin.register(CustomUser)
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
+    """Users changelist; only indexed columns are sortable."""
+    fieldsets = UserAdmin.fieldsets + (
+        ('Provider', {'fields': ('external_id',)}),
+    )
+    list_display = ['id', 'username', 'email', 'external_id', 'is_staff', 'date_joined']
+    list_filter = ['is_staff', 'is_superuser', 'is_active']
+    search_fields = ['username', 'external_id']
+    search_help_text = 'Exact username or external ID.'
+    sortable_by = ['id', 'username']
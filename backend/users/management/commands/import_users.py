@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from providers.registration_cache import UnregisteredUserCache
+
+User = get_user_model()
+
+STAGING_TABLE = 'users_import_staging'
+IMPORT_COLUMNS = ['username', 'external_id', 'email']
+
+
+class Command(BaseCommand):
+    help = 'Bulk creates or updates users and their external_id from a CSV or NDJSON file using COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            type=str,
+            help='CSV (with a header row) or NDJSON file with username, external_id and optional email',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'ndjson'],
+            help='Input format (defaults to the file extension)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50000,
+            help='Rows copied and upserted per transaction',
+        )
+
+    def handle(self, *args, **options):
+        input_format = options['format'] or ('ndjson' if options['path'].endswith(('.ndjson', '.jsonl')) else 'csv')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        totals = {'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0}
+        try:
+            source = open(options['path'], newline='')
+        except OSError as exc:
+            raise CommandError(f'Cannot read {options["path"]}: {exc}')
+
+        with source, connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} '
+                f'(position bigserial, username varchar(150), external_id varchar(120), email varchar(254))'
+            )
+            records = self.read_records(source, input_format)
+            try:
+                while batch := list(islice(records, options['batch_size'])):
+                    created, updated, skipped = self.import_batch(cursor, batch)
+                    totals['rows'] += len(batch)
+                    totals['created'] += created
+                    totals['updated'] += updated
+                    totals['skipped'] += skipped
+                    self.stdout.write(
+                        f'Processed {totals["rows"]} rows '
+                        f'({totals["created"]} created, {totals["updated"]} updated, {totals["skipped"]} skipped)'
+                    )
+            finally:
+                cursor.execute(f'DROP TABLE IF EXISTS {STAGING_TABLE}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {totals["rows"]} rows: {totals["created"]} users created, '
+                f'{totals["updated"]} updated, {totals["skipped"]} skipped'
+            )
+        )
+        if totals['created'] + totals['updated'] and not UnregisteredUserCache.is_shared():
+            self.stderr.write(self.style.WARNING(UnregisteredUserCache.unshared_warning()))
+
+    def read_records(self, source, input_format):
+        """Yield one dict per input row without loading the file in memory."""
+        if input_format == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise CommandError(f'Invalid JSON on line {line_number}: {exc}')
+
+    def import_batch(self, cursor, batch):
+        """
+        COPY one batch into the staging table and merge it into the users table with a single
+        INSERT ... ON CONFLICT statement. Returns the (created, updated, skipped) counts.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        skipped = 0
+        for record in batch:
+            username = (record.get('username') or '').strip()
+            if not username:
+                skipped += 1
+                continue
+            writer.writerow([username, record.get('external_id') or None, record.get('email') or None])
+        buffer.seek(0)
+
+        with transaction.atomic():
+            cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+            cursor.copy_expert(
+                f'COPY {STAGING_TABLE} ({", ".join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)', buffer,
+            )
+            # external_ids about to be replaced, so their cached provider answers can be dropped.
+            cursor.execute(f'''
+                SELECT DISTINCT users.external_id
+                FROM {User._meta.db_table} AS users JOIN {STAGING_TABLE} AS staged USING (username)
+                WHERE users.external_id IS DISTINCT FROM staged.external_id
+            ''')
+            changed_external_ids = [row[0] for row in cursor.fetchall()]
+            # Missing values are written as empty CSV fields, which COPY reads as NULL.
+            # DISTINCT ON keeps the last occurrence of a username, as ON CONFLICT may only touch a row once.
+            cursor.execute(f'''
+                INSERT INTO {User._meta.db_table} (
+                    username, external_id, email, password, first_name, last_name,
+                    is_superuser, is_staff, is_active, date_joined
+                )
+                SELECT DISTINCT ON (username)
+                    username, external_id, COALESCE(email, ''), '!' || md5(random()::text), '', '',
+                    false, false, true, now()
+                FROM {STAGING_TABLE}
+                ORDER BY username, position DESC
+                ON CONFLICT (username) DO UPDATE SET external_id = EXCLUDED.external_id
+                WHERE {User._meta.db_table}.external_id IS DISTINCT FROM EXCLUDED.external_id
+                RETURNING (xmax = 0) AS created, external_id
+            ''')
+            results = cursor.fetchall()
+
+        changed_external_ids.extend(external_id for _, external_id in results)
+        UnregisteredUserCache.invalidate(*changed_external_ids)
+        created = sum(1 for is_created, _ in results if is_created)
+        return created, len(results) - created, skipped
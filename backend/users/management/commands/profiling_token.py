@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from backend.profiling import make_profiling_token
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Prints a signed token that lets a staff user profile their requests (X-Profile-Token header)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', type=str, help='Username of the staff user')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'], is_staff=True)
+        except User.DoesNotExist:
+            raise CommandError(f'Staff user with username {options["username"]} not found')
+        self.stdout.write(make_profiling_token(user))
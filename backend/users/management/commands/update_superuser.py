@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from providers.registration_cache import UnregisteredUserCache
 
 User = get_user_model()
 
@@ -30,6 +31,8 @@ class Command(BaseCommand):
                     f'Successfully updated superuser {user.username} with external_id: {user.external_id}'
                 )
             )
+            if not UnregisteredUserCache.is_shared():
+                self.stderr.write(self.style.WARNING(UnregisteredUserCache.unshared_warning()))
         except User.DoesNotExist:
             self.stdout.write(
                 self.style.ERROR(
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='external_id',
+            field=models.CharField(blank=True, db_index=True, help_text='External identifier for the user in external systems', max_length=120, null=True, verbose_name='External ID'),
+        ),
+    ]
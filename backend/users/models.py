@@ -8,10 +8,20 @@ class CustomUser(AbstractUser):
         max_length=120,
         null=True,
         blank=True,
+        db_index=True,
         verbose_name=_('External ID'),
         help_text=_('External identifier for the user in external systems')
     )
 
+    # external_id as last loaded from or saved to the database, used to detect changes on save.
+    _loaded_external_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_external_id = instance.__dict__.get('external_id')
+        return instance
+
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from providers.registration_cache import UnregisteredUserCache
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_unregistered_user_cache(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Forget cached "not registered" answers for both the previous and the new external_id
+    whenever it may have changed, so a corrected user can issue cards immediately.
+    """
+    if update_fields is not None and 'external_id' not in update_fields:
+        return
+    previous = instance._loaded_external_id
+    if created or previous != instance.external_id:
+        UnregisteredUserCache.invalidate(previous, instance.external_id)
+    instance._loaded_external_id = instance.external_id